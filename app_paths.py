@@ -0,0 +1,30 @@
+import os
+import sys
+from pathlib import Path
+
+from app_meta import APP_SLUG
+
+DATA_DIR_ENV = "MEDIADROP_DATA_DIR"
+
+
+def user_data_dir() -> Path:
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Application Support"
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share"
+    return Path(base) / APP_SLUG
+
+
+def get_data_root() -> Path:
+    # Frozen builds run from a read-only bundle (or, with --onefile, a temp
+    # _MEI folder deleted on exit), so state that must outlive the process
+    # goes to the per-user data directory. A source checkout keeps it in
+    # downloads/ next to the code.
+    configured = os.environ.get(DATA_DIR_ENV)
+    if configured:
+        return Path(configured)
+    if getattr(sys, "frozen", False):
+        return user_data_dir()
+    return Path(__file__).resolve().parent / "downloads"
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+
+BANDWIDTH_LIMIT_ENV = "MEDIADROP_BANDWIDTH_LIMIT"
+BANDWIDTH_PER_JOB_LIMIT_ENV = "MEDIADROP_BANDWIDTH_PER_JOB_LIMIT"
+BURST_SECONDS = 0.5
+DEFAULT_CLASS_WEIGHTS = {
+    "audio": 3.0,
+    "video": 1.0,
+}
+
+UNIT_MULTIPLIERS = {
+    "": 1,
+    "k": 1024,
+    "m": 1024 * 1024,
+    "g": 1024 * 1024 * 1024,
+}
+
+
+def parse_rate(value: str | None) -> float:
+    if not value:
+        return 0.0
+    cleaned = value.strip().lower().removesuffix("/s").removesuffix("b")
+    unit = cleaned[-1:] if cleaned[-1:] in UNIT_MULTIPLIERS else ""
+    number = cleaned[: len(cleaned) - len(unit)]
+    try:
+        return max(float(number) * UNIT_MULTIPLIERS[unit], 0.0)
+    except ValueError:
+        return 0.0
+
+
+class TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate * BURST_SECONDS
+        self.updated_at = time.monotonic()
+
+    def set_rate(self, rate: float) -> None:
+        self._refill(time.monotonic())
+        self.rate = rate
+        self.tokens = min(self.tokens, rate * BURST_SECONDS)
+
+    def reserve(self, amount: int, now: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        # Going into debt queues callers in arrival order: each one waits
+        # for the debt accumulated by the callers before it.
+        self.tokens -= amount
+        return max(-self.tokens / self.rate, 0.0)
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self.tokens = min(self.tokens + (now - self.updated_at) * self.rate, self.rate * BURST_SECONDS)
+        self.updated_at = now
+
+
+class BandwidthLease:
+    def __init__(self, governor: "BandwidthGovernor", job_class: str, per_job_rate: float):
+        self.governor = governor
+        self.job_class = job_class
+        self.bucket = TokenBucket(per_job_rate)
+        self._seen_bytes: dict[str, int] = {}
+        self._closed = False
+
+    def consume(self, amount: int) -> None:
+        if amount <= 0 or self._closed:
+            return
+        delay = self.governor._reserve(self, amount)
+        if delay > 0:
+            time.sleep(delay)
+
+    def progress_hook(self, data: dict) -> None:
+        key = data.get("tmpfilename") or data.get("filename") or ""
+        downloaded = data.get("downloaded_bytes") or 0
+        if data["status"] == "downloading":
+            previous = self._seen_bytes.get(key, 0)
+            self._seen_bytes[key] = downloaded
+            self.consume(downloaded - previous)
+        elif data["status"] in {"finished", "error"}:
+            self._seen_bytes.pop(key, None)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.governor._release(self)
+
+    def __enter__(self) -> "BandwidthLease":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class BandwidthGovernor:
+    def __init__(self, total_rate: float = 0.0, per_job_rate: float = 0.0, weights: dict[str, float] | None = None):
+        self.total_rate = total_rate
+        self.per_job_rate = per_job_rate
+        self.weights = dict(DEFAULT_CLASS_WEIGHTS if weights is None else weights)
+        self._class_buckets: dict[str, TokenBucket] = {}
+        self._active: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "BandwidthGovernor":
+        return cls(
+            total_rate=parse_rate(os.environ.get(BANDWIDTH_LIMIT_ENV)),
+            per_job_rate=parse_rate(os.environ.get(BANDWIDTH_PER_JOB_LIMIT_ENV)),
+        )
+
+    def register(self, job_class: str) -> BandwidthLease:
+        with self._lock:
+            self._active[job_class] = self._active.get(job_class, 0) + 1
+            self._class_buckets.setdefault(job_class, TokenBucket(0.0))
+            self._rebalance()
+        return BandwidthLease(self, job_class, self.per_job_rate)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "total_rate": self.total_rate,
+                "per_job_rate": self.per_job_rate,
+                "active_jobs": dict(self._active),
+                "class_rates": {name: bucket.rate for name, bucket in self._class_buckets.items() if name in self._active},
+            }
+
+    def _reserve(self, lease: BandwidthLease, amount: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            class_delay = self._class_buckets[lease.job_class].reserve(amount, now)
+            job_delay = lease.bucket.reserve(amount, now)
+        return max(class_delay, job_delay)
+
+    def _release(self, lease: BandwidthLease) -> None:
+        with self._lock:
+            remaining = self._active.get(lease.job_class, 0) - 1
+            if remaining > 0:
+                self._active[lease.job_class] = remaining
+            else:
+                self._active.pop(lease.job_class, None)
+            self._rebalance()
+
+    def _rebalance(self) -> None:
+        # Only classes with running jobs take part, so an idle class never
+        # holds back bandwidth that another class could use.
+        total_weight = sum(self.weights.get(name, 1.0) for name in self._active)
+        for name in self._active:
+            share = self.weights.get(name, 1.0) / total_weight if total_weight else 1.0
+            self._class_buckets[name].set_rate(self.total_rate * share if self.total_rate > 0 else 0.0)
@@ -0,0 +1,44 @@
+from typing import Callable, Iterator
+
+
+def is_audio_only(fmt: dict) -> bool:
+    return fmt.get("vcodec") == "none" and fmt.get("acodec") not in {None, "none"}
+
+
+def audio_bitrate(fmt: dict) -> float | None:
+    return fmt.get("abr") or (fmt.get("tbr") if is_audio_only(fmt) else None)
+
+
+def track_rank(fmt: dict) -> tuple[float, float]:
+    # yt-dlp's default sort puts language and quality ahead of bitrate, which
+    # keeps dubbed or dynamic-range-compressed tracks behind the original.
+    language = fmt.get("language_preference")
+    quality = fmt.get("quality")
+    return (
+        float(language) if language is not None else -1.0,
+        float(quality) if quality is not None else -1.0,
+    )
+
+
+def smallest_sufficient_audio(min_kbps: int) -> Callable[[dict], Iterator[dict]]:
+    # Encoding to N kbps gains nothing from a source above N kbps, so pick
+    # the cheapest audio-only stream that still reaches the target.
+    # yt-dlp hands formats over sorted worst to best, which breaks ties.
+    def select(ctx: dict) -> Iterator[dict]:
+        formats = [fmt for fmt in ctx["formats"] if not fmt.get("has_drm")]
+        audio_only = [fmt for fmt in formats if is_audio_only(fmt)]
+        top_rank = max(map(track_rank, audio_only), default=None)
+        preferred = [fmt for fmt in audio_only if track_rank(fmt) == top_rank]
+        sufficient = [fmt for fmt in preferred if (audio_bitrate(fmt) or 0) >= min_kbps]
+        if sufficient:
+            yield min(reversed(sufficient), key=audio_bitrate)
+        elif audio_only:
+            # Same as bestaudio: nothing reaches the target, take the best.
+            yield audio_only[-1]
+        else:
+            # Same as best: a muxed stream that carries audio.
+            muxed = [fmt for fmt in formats if fmt.get("acodec") != "none" and fmt.get("vcodec") != "none"]
+            if muxed:
+                yield muxed[-1]
+
+    return select
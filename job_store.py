@@ -0,0 +1,79 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+COLUMNS = (
+    "id",
+    "url",
+    "mode",
+    "quality",
+    "video_quality",
+    "client_id",
+    "status",
+    "phase",
+    "output_dir",
+    "file_path",
+    "cache_key",
+    "cache_status",
+    "cached",
+    "error",
+    "created_at",
+    "finished_at",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    video_quality TEXT NOT NULL,
+    client_id TEXT,
+    status TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    file_path TEXT,
+    cache_key TEXT,
+    cache_status TEXT NOT NULL,
+    cached INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+) WITHOUT ROWID
+"""
+
+
+class JobStore:
+    # Web jobs are written on every status/phase transition (not on byte
+    # progress), so a restart finds each job's parameters and scratch
+    # directory and can pick up where it stopped.
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+
+    def save(self, record: dict) -> None:
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                tuple(record[column] for column in COLUMNS),
+            )
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def load_all(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY created_at").fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,96 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+JOURNAL_FILENAME = ".mediadrop-journal.sqlite3"
+
+ENTRY_RUNNING = "running"
+ENTRY_DONE = "done"
+ENTRY_FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    video_key TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    file TEXT,
+    size INTEGER,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (video_key, profile)
+) WITHOUT ROWID
+"""
+
+
+class BatchJournal:
+    # Completion log for CLI batches. Every write is its own transaction, so
+    # an interrupted run leaves at worst an item marked "running", which the
+    # next run retries (resuming its .part file).
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+
+    @classmethod
+    def for_output_dir(cls, output_dir: str | Path) -> "BatchJournal":
+        return cls(Path(output_dir) / JOURNAL_FILENAME)
+
+    def get(self, video_key: str, profile: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM items WHERE video_key = ? AND profile = ?", (video_key, profile)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def completed_file(self, video_key: str, profile: str) -> Path | None:
+        entry = self.get(video_key, profile)
+        if entry is None or entry["status"] != ENTRY_DONE or not entry["file"]:
+            return None
+        path = Path(entry["file"])
+        # A file deleted or truncated since it was recorded is downloaded again.
+        if not path.is_file() or path.stat().st_size != entry["size"]:
+            return None
+        return path
+
+    def mark_running(self, video_key: str, profile: str, url: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO items (video_key, profile, url, status, attempts, updated_at)
+                VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT (video_key, profile) DO UPDATE SET
+                    url = excluded.url,
+                    status = excluded.status,
+                    error = NULL,
+                    attempts = attempts + 1,
+                    updated_at = excluded.updated_at
+                """,
+                (video_key, profile, url, ENTRY_RUNNING, time.time()),
+            )
+
+    def mark_done(self, video_key: str, profile: str, file: str) -> None:
+        size = Path(file).stat().st_size
+        self._finish(video_key, profile, ENTRY_DONE, file=file, size=size, error=None)
+
+    def mark_failed(self, video_key: str, profile: str, error: str | None) -> None:
+        self._finish(video_key, profile, ENTRY_FAILED, file=None, size=None, error=error)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _finish(self, video_key: str, profile: str, status: str, **values) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE items SET status = ?, file = ?, size = ?, error = ?, updated_at = ? "
+                "WHERE video_key = ? AND profile = ?",
+                (status, values["file"], values["size"], values["error"], time.time(), video_key, profile),
+            )
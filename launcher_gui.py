@@ -1,15 +1,19 @@
 import os
 import platform
+import socket
 import subprocess
 import sys
 import threading
-import time
 import webbrowser
 import importlib
 from pathlib import Path
-from urllib.error import URLError
+from typing import TYPE_CHECKING, Callable
 from urllib.request import urlopen
 
+from startup_profile import StartupProfiler
+
+startup_profiler = StartupProfiler.from_argv(sys.argv)
+
 try:
     import tkinter as tk
     from tkinter import messagebox, ttk
@@ -21,15 +25,15 @@ except Exception:
     ttk = None
     TK_AVAILABLE = False
 
-import uvicorn
-
 from app_meta import (
     APP_AUTHOR,
     APP_DISPLAY_NAME,
     APP_LAUNCHER_NAME,
     APP_VERSION,
 )
-from web_app import app as fastapi_app
+
+if TYPE_CHECKING:
+    import uvicorn
 
 try:
     pystray = importlib.import_module("pystray")
@@ -48,16 +52,56 @@ HOST = "127.0.0.1"
 PORT = 8000
 APP_URL = f"http://{HOST}:{PORT}"
 APP_HEALTH_URL = f"{APP_URL}/health"
+SOCKET_BACKLOG = 2048
+EXTERNAL_PROBE_SECONDS = 2.0
+
+SERVER_STOPPED = "stopped"
+SERVER_STARTING = "starting"
+SERVER_RUNNING = "running"
+SERVER_STOPPING = "stopping"
+SERVER_CRASHED = "crashed"
+SERVER_EXTERNAL = "external"
 
 
 def is_server_reachable(timeout: float = 1.2) -> bool:
     try:
         with urlopen(APP_HEALTH_URL, timeout=timeout):
             return True
-    except URLError:
+    except OSError:
         return False
 
 
+def bind_server_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if platform.system() != "Windows":
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind((HOST, PORT))
+        sock.listen(SOCKET_BACKLOG)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def create_observed_server(config: "uvicorn.Config", controller: "ServerController") -> "uvicorn.Server":
+    import uvicorn
+
+    class ObservedServer(uvicorn.Server):
+        # uvicorn already knows when it is serving and when it shuts down;
+        # forwarding that beats probing /health from the outside.
+        async def startup(self, sockets=None) -> None:
+            await super().startup(sockets=sockets)
+            if self.started:
+                controller._set_state(SERVER_RUNNING)
+
+        async def shutdown(self, sockets=None) -> None:
+            controller._set_state(SERVER_STOPPING)
+            await super().shutdown(sockets=sockets)
+
+    return ObservedServer(config)
+
+
 class AutoStartManager:
     def __init__(self):
         self.system = platform.system()
@@ -181,46 +225,125 @@ class AutoStartManager:
 class ServerController:
     def __init__(self):
         self.thread: threading.Thread | None = None
-        self.server: uvicorn.Server | None = None
+        self.server: "uvicorn.Server | None" = None
         self.started_by_launcher = False
+        self.state = SERVER_STOPPED
+        self.error: str | None = None
+        self._listeners: list[Callable[[str], None]] = []
+        self._state_lock = threading.Lock()
+        self._stop_requested = threading.Event()
+        self._monitor: threading.Thread | None = None
+        self._monitor_stop = threading.Event()
+
+    def add_listener(self, callback: Callable[[str], None]) -> None:
+        self._listeners.append(callback)
 
     def is_running(self) -> bool:
         return bool(self.thread and self.thread.is_alive())
 
+    def is_ready(self) -> bool:
+        return self.state == SERVER_RUNNING
+
+    def is_available(self) -> bool:
+        return self.state in {SERVER_RUNNING, SERVER_EXTERNAL}
+
     def start(self) -> bool:
-        if self.is_running():
+        if self.is_running() or self.state == SERVER_EXTERNAL:
             return True
 
-        if is_server_reachable():
-            self.started_by_launcher = False
-            return True
+        try:
+            sock = bind_server_socket()
+        except OSError as exc:
+            if is_server_reachable():
+                self.started_by_launcher = False
+                self._set_state(SERVER_EXTERNAL)
+                return True
+            self._set_state(SERVER_CRASHED, f"A porta {PORT} está em uso por outro programa ({exc}).")
+            return False
 
-        config = uvicorn.Config(
-            fastapi_app,
-            host=HOST,
-            port=PORT,
-            log_level="warning",
-            access_log=False,
-        )
-        self.server = uvicorn.Server(config)
-        self.thread = threading.Thread(target=self.server.run, daemon=True)
-        self.thread.start()
+        self._stop_requested.clear()
         self.started_by_launcher = True
+        self._set_state(SERVER_STARTING)
+        self.thread = threading.Thread(target=self._serve, args=(sock,), daemon=True)
+        self.thread.start()
         return True
 
+    def _serve(self, sock: socket.socket) -> None:
+        # The port is already listening, so the browser's first request waits
+        # in the backlog while uvicorn and the web app are imported here.
+        error = None
+        try:
+            import uvicorn
+            from web_app import app as fastapi_app
+
+            startup_profiler.mark("web_app importado")
+            config = uvicorn.Config(
+                fastapi_app,
+                log_level="warning",
+                access_log=False,
+            )
+            self.server = create_observed_server(config, self)
+            if not self._stop_requested.is_set():
+                self.server.run(sockets=[sock])
+        except (Exception, SystemExit) as exc:
+            error = str(exc) or exc.__class__.__name__
+        finally:
+            sock.close()
+
+        if self._stop_requested.is_set():
+            self._set_state(SERVER_STOPPED)
+        else:
+            self._set_state(SERVER_CRASHED, error or "O servidor encerrou inesperadamente.")
+
     def stop(self) -> bool:
-        if not self.started_by_launcher or not self.server:
+        if not self.started_by_launcher or not self.thread:
             return False
 
-        self.server.should_exit = True
-        if self.thread:
-            self.thread.join(timeout=3)
+        self._stop_requested.set()
+        if self.is_running():
+            self._set_state(SERVER_STOPPING)
+        if self.server:
+            self.server.should_exit = True
+        self.thread.join(timeout=3)
 
         self.started_by_launcher = False
         self.thread = None
         self.server = None
         return True
 
+    def start_monitoring(self) -> None:
+        # Servers started outside the launcher have no events to listen to,
+        # so those alone are probed over HTTP, off the UI thread.
+        if self._monitor and self._monitor.is_alive():
+            return
+        self._monitor_stop.clear()
+        self._monitor = threading.Thread(target=self._monitor_external, daemon=True)
+        self._monitor.start()
+
+    def stop_monitoring(self) -> None:
+        self._monitor_stop.set()
+
+    def _monitor_external(self) -> None:
+        while not self._monitor_stop.is_set():
+            if not self.is_running():
+                if is_server_reachable(timeout=1.0):
+                    self._set_state(SERVER_EXTERNAL)
+                elif self.state == SERVER_EXTERNAL:
+                    self._set_state(SERVER_STOPPED)
+            self._monitor_stop.wait(EXTERNAL_PROBE_SECONDS)
+
+    def _set_state(self, state: str, error: str | None = None) -> None:
+        with self._state_lock:
+            if state == self.state and error == self.error:
+                return
+            self.state = state
+            self.error = error
+        for callback in list(self._listeners):
+            try:
+                callback(state)
+            except Exception:
+                pass
+
 
 class TrayController:
     def __init__(self, app_ref: "LauncherApp"):
@@ -271,9 +394,9 @@ class TrayOnlyLauncher:
         return image
 
     def _open_page(self):
-        if not is_server_reachable():
-            self.controller.start()
-            time.sleep(0.8)
+        # start() binds the port before returning, so the browser can
+        # connect right away even while the server is still loading.
+        self.controller.start()
         webbrowser.open(APP_URL)
 
     def _start_server(self):
@@ -290,6 +413,7 @@ class TrayOnlyLauncher:
     def run(self):
         self.controller.start()
         webbrowser.open(APP_URL)
+        startup_profiler.mark("navegador aberto")
 
         menu = pystray.Menu(
             pystray.MenuItem("Abrir página", lambda: self._open_page()),
@@ -299,6 +423,7 @@ class TrayOnlyLauncher:
         )
         self.icon = pystray.Icon(APP_LAUNCHER_NAME, self._create_image(), APP_DISPLAY_NAME, menu)
         self.icon.run()
+        startup_profiler.report()
 
 
 class LauncherApp:
@@ -317,8 +442,13 @@ class LauncherApp:
         self.auto_start_var = tk.BooleanVar(value=self.autostart.is_enabled())
         self.minimize_to_tray_var = tk.BooleanVar(value=TRAY_AVAILABLE)
 
+        self.open_when_ready = False
+
         self._build_ui()
-        self._poll_status()
+        self.controller.add_listener(lambda state: self.run_ui_safe(lambda: self._on_server_state(state)))
+        self.controller.start_monitoring()
+        self._update_buttons(self.controller.state)
+        root.after_idle(lambda: startup_profiler.mark("janela exibida"))
 
         if self.tray:
             self.tray.start()
@@ -450,53 +580,28 @@ class LauncherApp:
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
-    def wait_until_ready(self, timeout_seconds: float = 8.0) -> bool:
-        started_at = time.time()
-        while time.time() - started_at < timeout_seconds:
-            if is_server_reachable(timeout=1.2):
-                return True
-            time.sleep(0.2)
-        return False
-
     def start_server(self):
-        if is_server_reachable():
+        if self.controller.is_available():
             self._set_status("Servidor já está online", "#74f0d0")
             webbrowser.open(APP_URL)
             return
 
-        self._set_status("Iniciando servidor...", "#f6d365")
-        self.controller.start()
-
-        def check_ready():
-            ready = self.wait_until_ready()
-            if ready:
-                self.run_ui_safe(lambda: self._set_status("Servidor online", "#74f0d0"))
-                webbrowser.open(APP_URL)
-            else:
-                self.run_ui_safe(lambda: self._set_status("Falha ao iniciar", "#ff8fb1"))
-                self.run_ui_safe(
-                    lambda: messagebox.showerror(
-                        "Erro",
-                        "Não foi possível iniciar o servidor local na porta 8000.",
-                    )
-                )
-
-        threading.Thread(target=check_ready, daemon=True).start()
+        # Readiness, failures and the browser launch arrive as controller
+        # events in _on_server_state.
+        self.open_when_ready = True
+        if not self.controller.start():
+            self.open_when_ready = False
 
     def stop_server(self):
         if not self.controller.started_by_launcher:
             self._set_status("Servidor externo em uso (não parado)", "#8fb4d8")
             return
 
-        self._set_status("Parando servidor...", "#f6d365")
-        stopped = self.controller.stop()
-        if stopped:
-            self._set_status("Servidor parado", "#ff8fb1")
-        else:
+        if not self.controller.stop():
             self._set_status("Nenhum servidor iniciado pelo launcher", "#8fb4d8")
 
     def open_page(self):
-        if is_server_reachable():
+        if self.controller.is_available():
             self._set_status("Abrindo aplicação no navegador", "#74f0d0")
             webbrowser.open(APP_URL)
             return
@@ -509,13 +614,38 @@ class LauncherApp:
         self.root.lift()
         self.root.focus_force()
 
-    def _poll_status(self):
-        reachable = is_server_reachable(timeout=0.5)
-        self.start_btn.configure(state=("disabled" if reachable else "normal"))
-        self.stop_btn.configure(state=("normal" if self.controller.started_by_launcher else "disabled"))
-        self.root.after(500, self._poll_status)
+    def _update_buttons(self, state: str):
+        busy = state in {SERVER_STARTING, SERVER_RUNNING, SERVER_STOPPING, SERVER_EXTERNAL}
+        self.start_btn.configure(state=("disabled" if busy else "normal"))
+        owned = self.controller.started_by_launcher and state in {SERVER_STARTING, SERVER_RUNNING}
+        self.stop_btn.configure(state=("normal" if owned else "disabled"))
+
+    def _on_server_state(self, state: str):
+        self._update_buttons(state)
+        if state == SERVER_STARTING:
+            self._set_status("Iniciando servidor...", "#f6d365")
+        elif state == SERVER_RUNNING:
+            self._set_status("Servidor online", "#74f0d0")
+            startup_profiler.report("servidor pronto")
+            if self.open_when_ready:
+                self.open_when_ready = False
+                webbrowser.open(APP_URL)
+        elif state == SERVER_EXTERNAL:
+            self._set_status("Servidor externo online", "#74f0d0")
+            if self.open_when_ready:
+                self.open_when_ready = False
+                webbrowser.open(APP_URL)
+        elif state == SERVER_STOPPING:
+            self._set_status("Parando servidor...", "#f6d365")
+        elif state == SERVER_STOPPED:
+            self._set_status("Servidor parado", "#ff8fb1")
+        elif state == SERVER_CRASHED:
+            self.open_when_ready = False
+            self._set_status("Falha no servidor", "#ff8fb1")
+            messagebox.showerror("Erro", f"O servidor local parou: {self.controller.error}")
 
     def exit_app(self):
+        self.controller.stop_monitoring()
         self.controller.stop()
         if self.tray:
             self.tray.stop()
@@ -538,6 +668,7 @@ def main():
         ttk.Style().theme_use("clam")
         LauncherApp(root)
         root.mainloop()
+        startup_profiler.report()
         return
 
     if TRAY_AVAILABLE:
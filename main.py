@@ -1,11 +1,24 @@
 # pylint: disable=missing-function-docstring
 # pylint: disable=broad-exception-caught
+import argparse
+import contextlib
+import json
 import os
-import shutil
 import platform
+import sqlite3
 import sys
+import threading
+import time
 import concurrent.futures
-import yt_dlp
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+from startup_profile import StartupProfiler
+
+startup_profiler = StartupProfiler.from_argv(sys.argv)
+
+# pylint: disable=wrong-import-position
 from rich.console import Console
 from rich.panel import Panel
 from rich.progress import (
@@ -17,9 +30,67 @@ from rich.progress import (
     TransferSpeedColumn,
     TimeRemainingColumn,
 )
-import questionary
+
+from bandwidth import BandwidthGovernor
+from format_selection import smallest_sufficient_audio
+from journal import BatchJournal
+from media_modes import AUDIO_MODES, MP3_QUALITIES, PASSTHROUGH_AUDIO_MODES, output_profile
+from toolchain import ToolchainProbe
+from transcode import DeferredPostProcessing, TranscodePool
+from youtube_urls import extract_video_id
 
 console = Console()
+bandwidth_governor = BandwidthGovernor.from_env()
+transcode_pool = TranscodePool.from_env()
+
+ITEM_DONE = "done"
+ITEM_FAILED = "failed"
+ITEM_SKIPPED = "skipped"
+ITEM_DUPLICATE = "duplicate"
+QUALIDADES_MP3 = tuple(int(quality) for quality in MP3_QUALITIES)
+WORKERS_PADRAO = 3
+
+
+@dataclass
+class ResultadoItem:
+    url: str
+    video_id: str | None = None
+    status: str = ITEM_FAILED
+    title: str | None = None
+    file: str | None = None
+    error: str | None = None
+    started_at: float = 0.0
+    seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "event": "item",
+            "url": self.url,
+            "video_id": self.video_id,
+            "status": self.status,
+            "title": self.title,
+            "file": self.file,
+            "error": self.error,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def canonicalizar_url(linha: str) -> str | None:
+    # Every link form of a video (youtu.be, m./music., shorts, &t=...) maps
+    # to one watch URL, so duplicates are caught before anything is queued.
+    texto = linha.strip()
+    if not texto:
+        return None
+    if not texto.lower().startswith(("http://", "https://")):
+        # Without a scheme only YouTube links count (anything else is usually a comment).
+        video_id = extract_video_id(f"https://{texto}")
+        return url_canonica(video_id) if video_id else None
+    video_id = extract_video_id(texto)
+    return url_canonica(video_id) if video_id else texto
+
+
+def url_canonica(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
 
 
 def get_runtime_root() -> str:
@@ -28,18 +99,16 @@ def get_runtime_root() -> str:
     return os.path.dirname(os.path.abspath(__file__))
 
 
+toolchain_probe = ToolchainProbe(
+    (
+        os.path.join(get_runtime_root(), "ffmpeg"),
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "ffmpeg"),
+    )
+)
+
+
 def get_ffmpeg_path():
-    pasta_projeto = get_runtime_root()
-    candidates = [
-        os.path.join(pasta_projeto, "ffmpeg", "ffmpeg"),
-        os.path.join(pasta_projeto, "ffmpeg", "ffmpeg.exe"),
-        os.path.join(os.path.dirname(os.path.abspath(__file__)), "ffmpeg", "ffmpeg"),
-        os.path.join(os.path.dirname(os.path.abspath(__file__)), "ffmpeg", "ffmpeg.exe"),
-    ]
-    for candidate in candidates:
-        if os.path.exists(candidate):
-            return candidate
-    return shutil.which("ffmpeg")
+    return toolchain_probe.get().ffmpeg_path
 
 
 def show_header():
@@ -63,6 +132,47 @@ class IDLogger:
         console.print(f"[red][ERRO] {msg}[/red]")
 
 
+class SessoesYDL:
+    # One long-lived YoutubeDL per worker thread and option set, so a batch
+    # reuses HTTP connections and yt-dlp's player/JS caches across URLs.
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._todas: list[DeferredPostProcessing] = []
+
+    def obter(self, chave: tuple, criar: Callable) -> DeferredPostProcessing:
+        por_chave = getattr(self._local, "por_chave", None)
+        if por_chave is None:
+            por_chave = self._local.por_chave = {}
+        if chave not in por_chave:
+            por_chave[chave] = DeferredPostProcessing(criar())
+            with self._lock:
+                self._todas.append(por_chave[chave])
+        return por_chave[chave]
+
+    def fechar(self) -> None:
+        with self._lock:
+            todas, self._todas = self._todas, []
+        for deferred in todas:
+            deferred.close()
+
+    def __enter__(self) -> "SessoesYDL":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.fechar()
+
+
+# A reused YoutubeDL keeps the hooks it was built with, so they look up the
+# item the current thread is downloading instead of closing over it.
+item_atual = threading.local()
+
+
+def hook_item_atual(d):
+    item_atual.lease.progress_hook(d)
+    progress_hook(d, item_atual.task_id, item_atual.progress)
+
+
 def progress_hook(d, task_id, progress):
     if d["status"] == "downloading":
         total_bytes = d.get("total_bytes") or d.get("total_bytes_estimate")
@@ -70,98 +180,354 @@ def progress_hook(d, task_id, progress):
         if total_bytes:
             progress.update(task_id, total=total_bytes, completed=downloaded_bytes)
     elif d["status"] == "finished":
-        progress.update(task_id, completed=d.get("total_bytes"), description="[green]Processando MP3...[/green]")
+        progress.update(task_id, completed=d.get("total_bytes"), description="[green]Processando áudio...[/green]")
+
+
+def pasta_downloads_padrao() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "downloads")
 
 
-def baixar_audio(url: str, quality: int, progress: Progress, task_id):
-    pasta_projeto = os.path.dirname(os.path.abspath(__file__))
+def baixar_audio(
+    url: str,
+    quality: int,
+    progress: Progress,
+    task_id,
+    formato: str = "mp3",
+    pasta_destino: str | None = None,
+    resultado: ResultadoItem | None = None,
+    sessoes: SessoesYDL | None = None,
+) -> concurrent.futures.Future | None:
+    resultado = resultado or ResultadoItem(url)
     caminho_ffmpeg = get_ffmpeg_path()
-    pasta_destino = os.path.join(pasta_projeto, "downloads")
+    pasta_destino = pasta_destino or pasta_downloads_padrao()
     os.makedirs(pasta_destino, exist_ok=True)
 
     if not caminho_ffmpeg:
+        resultado.error = "FFmpeg não encontrado."
         console.print("[red]FFmpeg não encontrado! Verifique a instalação.[/red]")
-        return
+        return None
+    faltando = toolchain_probe.get().missing_for(formato)
+    if faltando:
+        resultado.error = f"FFmpeg sem suporte a {formato.upper()}: {', '.join(faltando)}"
+        console.print(f"[red]O FFmpeg instalado não suporta {formato.upper()} (falta: {', '.join(faltando)}).[/red]")
+        return None
+
+    # yt-dlp only loads once there is something to download, so the menu
+    # comes up without waiting for it.
+    import yt_dlp
+
+    passthrough = PASSTHROUGH_AUDIO_MODES.get(formato)
+    codec = passthrough["codec"] if passthrough else "mp3"
+    extrair_audio = {"key": "FFmpegExtractAudio", "preferredcodec": codec}
+    if codec == "mp3":
+        extrair_audio["preferredquality"] = str(quality)
 
     ydl_opts = {
-        "format": "bestaudio/best",
+        "format": passthrough["format"] if passthrough else smallest_sufficient_audio(quality),
         "ffmpeg_location": caminho_ffmpeg,
         "outtmpl": os.path.join(pasta_destino, "%(title)s.%(ext)s"),
-        "postprocessors": [
-            {
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
-                "preferredquality": str(quality),
-            }
-        ],
+        "postprocessors": [extrair_audio],
         "logger": IDLogger(),
-        "progress_hooks": [lambda d: progress_hook(d, task_id, progress)],
+        "progress_hooks": [hook_item_atual],
+        # Keep and continue .part files, so an interrupted batch resumes
+        # mid-download items instead of starting them over.
+        "continuedl": True,
         "quiet": True,
         "no_warnings": True,
     }
-
+    if sessoes is None:
+        deferred = DeferredPostProcessing(yt_dlp.YoutubeDL(ydl_opts))
+    else:
+        chave = (codec, quality, pasta_destino)
+        deferred = sessoes.obter(chave, lambda: yt_dlp.YoutubeDL(ydl_opts))
+
+    item_atual.lease = bandwidth_governor.register("audio")
+    item_atual.task_id = task_id
+    item_atual.progress = progress
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            title = info.get("title", "Desconhecido")
-            progress.update(task_id, description=f"[cyan]Baixando: {title}[/cyan]")
-            ydl.download([url])
-            progress.update(task_id, description=f"[green]Concluído: {title}[/green]")
+        # Extract once without resolving formats, then let the same result
+        # drive format selection and the download (download([url]) would
+        # fetch the page a second time).
+        info = deferred.ydl.extract_info(url, download=False, process=False)
+        title = info.get("title") or "Desconhecido"
+        resultado.title = title
+        progress.update(task_id, description=f"[cyan]Baixando: {title}[/cyan]")
+        deferred.ydl.process_ie_result(info, download=True)
     except Exception as exc:
+        deferred.pending.clear()
+        if sessoes is None:
+            deferred.close()
+        resultado.error = str(exc)
         progress.update(task_id, description=f"[red]Erro: {exc}[/red]")
+        return None
+    finally:
+        item_atual.lease.close()
+
+    if sessoes is not None:
+        deferred = deferred.take()
+
+    # The FFmpeg step runs on the CPU pool so this thread can start the
+    # next download.
+    progress.update(task_id, description=f"[yellow]Na fila de conversão: {title}[/yellow]")
+    return transcode_pool.submit(converter_audio, deferred, title, progress, task_id, codec, resultado)
+
+
+def converter_audio(
+    deferred: DeferredPostProcessing,
+    title: str,
+    progress: Progress,
+    task_id,
+    codec: str,
+    resultado: ResultadoItem | None = None,
+):
+    progress.update(task_id, description=f"[green]Processando {codec.upper()}: {title}[/green]")
+    try:
+        infos = deferred.run()
+        if resultado is not None:
+            resultado.status = ITEM_DONE
+            resultado.file = infos[-1].get("filepath") if infos else None
+        progress.update(task_id, description=f"[green]Concluído: {title}[/green]")
+    except Exception as exc:
+        if resultado is not None:
+            resultado.error = str(exc)
+        progress.update(task_id, description=f"[red]Erro: {exc}[/red]")
+    finally:
+        deferred.close()
+
+
+def ler_urls(arquivo, descartes: Counter | None = None) -> Iterator[str]:
+    vistas: set[str] = set()
+    for line in arquivo:
+        url = canonicalizar_url(line)
+        if url is None:
+            continue
+        if url in vistas:
+            if descartes is not None:
+                descartes[ITEM_DUPLICATE] += 1
+            continue
+        vistas.add(url)
+        yield url
+
+
+def criar_progresso() -> Progress:
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        DownloadColumn(),
+        TransferSpeedColumn(),
+        TimeRemainingColumn(),
+        console=console,
+    )
 
 
-def processar_lista_urls(arquivo: str, quality: int):
+def executar_lote(
+    urls: Iterable[str],
+    quality: int,
+    formato: str,
+    workers: int,
+    pasta_destino: str | None = None,
+    ao_concluir: Callable[[ResultadoItem], None] | None = None,
+    journal: BatchJournal | None = None,
+) -> Counter:
+    # URLs are pulled from the iterable only when there is room, and a bar
+    # exists only while its item is downloading or converting, so a list
+    # with thousands of lines costs as much as the few items in flight.
+    totais: Counter = Counter()
+    limite = workers * 2
+    sessoes = SessoesYDL()
+    perfil = output_profile(formato, str(quality), "")
+
+    with criar_progresso() as progress:
+        geral = progress.add_task("[bold]Lote: 0 concluídos[/bold]", total=None)
+
+        def iniciar(resultado: ResultadoItem):
+            task_id = progress.add_task(f"[cyan]Iniciando: {resultado.url}[/cyan]", total=None)
+            resultado.started_at = time.monotonic()
+            return task_id, baixar_audio(
+                resultado.url, quality, progress, task_id, formato, pasta_destino, resultado, sessoes
+            )
+
+        with sessoes, concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            pendentes: dict[concurrent.futures.Future, tuple[ResultadoItem, object]] = {}
+
+            def finalizar(resultado: ResultadoItem, task_id) -> None:
+                if task_id is not None:
+                    progress.remove_task(task_id)
+                if journal is not None and resultado.status != ITEM_SKIPPED:
+                    chave = resultado.video_id or resultado.url
+                    if resultado.status == ITEM_DONE and resultado.file and os.path.isfile(resultado.file):
+                        journal.mark_done(chave, perfil, resultado.file)
+                    else:
+                        journal.mark_failed(chave, perfil, resultado.error)
+                resultado.seconds = time.monotonic() - resultado.started_at if resultado.started_at else 0.0
+                totais[resultado.status] += 1
+                progress.update(geral, description=f"[bold]Lote: {sum(totais.values())} concluídos[/bold]")
+                if ao_concluir is not None:
+                    ao_concluir(resultado)
+
+            def drenar() -> None:
+                prontos, _ = concurrent.futures.wait(pendentes, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in prontos:
+                    resultado, task_id = pendentes.pop(future)
+                    if task_id is not None:
+                        # Conversion finished (converter_audio never raises).
+                        finalizar(resultado, task_id)
+                        continue
+                    try:
+                        task_id, conversao = future.result()
+                    except Exception as exc:
+                        resultado.error = str(exc)
+                        finalizar(resultado, None)
+                        continue
+                    if conversao is None:
+                        finalizar(resultado, task_id)
+                    else:
+                        pendentes[conversao] = (resultado, task_id)
+
+            for url in urls:
+                while len(pendentes) >= limite:
+                    drenar()
+                resultado = ResultadoItem(url, extract_video_id(url))
+                if journal is not None:
+                    chave = resultado.video_id or url
+                    concluido = journal.completed_file(chave, perfil)
+                    if concluido is not None:
+                        resultado.status = ITEM_SKIPPED
+                        resultado.file = str(concluido)
+                        finalizar(resultado, None)
+                        continue
+                    journal.mark_running(chave, perfil, url)
+                pendentes[executor.submit(iniciar, resultado)] = (resultado, None)
+            while pendentes:
+                drenar()
+
+    return totais
+
+
+def processar_lista_urls(arquivo: str, quality: int, formato: str = "mp3"):
     if not os.path.exists(arquivo):
         console.print(f"[red]Arquivo não encontrado: {arquivo}[/red]")
         return
 
-    urls = []
+    console.print("\n[bold green]Iniciando downloads...[/bold green]\n")
+    descartes: Counter = Counter()
+    pasta_destino = pasta_downloads_padrao()
+    journal = BatchJournal.for_output_dir(pasta_destino)
     try:
         with open(arquivo, "r", encoding="utf-8") as F:
-            urls = [line.strip() for line in F if line.strip().startswith(("http", "https"))]
-    except Exception as e:
+            totais = executar_lote(ler_urls(F, descartes), quality, formato, WORKERS_PADRAO, pasta_destino, journal=journal)
+    except OSError as e:
         console.print(f"[red]Erro ao ler arquivo: {e}[/red]")
         return
+    finally:
+        journal.close()
 
-    if not urls:
+    if not totais:
         console.print("[yellow]Nenhuma URL válida encontrada.[/yellow]")
         return
-    
-    console.print(f"\n[bold green]Iniciando download de {len(urls)} vídeos...[/bold green]\n")
 
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        DownloadColumn(),
-        TransferSpeedColumn(),
-        TimeRemainingColumn(),
-        console=console,
-    ) as progress:
-        
-        # Create a task for each URL immediately so they show up
-        tasks = {}
-        for url in urls:
-            task_id = progress.add_task(f"[dim]Aguardando: {url}[/dim]", start=False)
-            tasks[url] = task_id
-
-        # Run downloads in parallel (max 3 workers)
-        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-            futures = []
-            for url in urls:
-                task_id = tasks[url]
-                progress.start_task(task_id)
-                futures.append(executor.submit(baixar_audio, url, quality, progress, task_id))
-            concurrent.futures.wait(futures)
+    console.print(
+        Panel(
+            f"[bold green]Todos os downloads concluídos![/bold green] "
+            f"{totais[ITEM_DONE]} ok, {totais[ITEM_SKIPPED]} já baixados, {totais[ITEM_FAILED]} com erro, "
+            f"{descartes[ITEM_DUPLICATE]} repetidos ignorados.",
+            border_style="green",
+        )
+    )
 
-    console.print(Panel("[bold green]Todos os downloads concluídos![/bold green]", border_style="green"))
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Baixa áudios do YouTube em lote, sem menus (ideal para cron/scripts).",
+    )
+    parser.add_argument("-i", "--input", required=True, help="arquivo com uma URL por linha ('-' para stdin)")
+    parser.add_argument("-o", "--output", default=pasta_downloads_padrao(), help="pasta de destino")
+    parser.add_argument("-m", "--mode", choices=sorted(AUDIO_MODES), default="mp3", help="formato do áudio")
+    parser.add_argument("-q", "--quality", type=int, choices=QUALIDADES_MP3, default=192, help="kbps do MP3")
+    parser.add_argument("-w", "--workers", type=int, default=WORKERS_PADRAO, help="downloads simultâneos")
+    parser.add_argument("--summary", default="-", help="arquivo JSON Lines do resumo ('-' para stdout)")
+    parser.add_argument(
+        "--journal",
+        help="banco SQLite que registra os itens concluídos para retomar o lote "
+        "(padrão: .mediadrop-journal.sqlite3 na pasta de destino)",
+    )
+    return parser
+
+
+def main_cli(argv: list[str]) -> int:
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers deve ser pelo menos 1")
+
+    # stdout is reserved for the JSON Lines summary; bars and messages go to stderr.
+    console.file = sys.stderr
+    faltando = toolchain_probe.get().missing_for(args.mode)
+    if faltando:
+        console.print(f"[red]FFmpeg indisponível para {args.mode.upper()}: {', '.join(faltando)}[/red]")
+        return 2
+
+    with contextlib.ExitStack() as pilha:
+        try:
+            entrada = sys.stdin
+            if args.input != "-":
+                entrada = pilha.enter_context(open(args.input, "r", encoding="utf-8"))
+        except OSError as exc:
+            console.print(f"[red]Erro ao ler arquivo: {exc}[/red]")
+            return 2
+        try:
+            saida = sys.stdout
+            if args.summary != "-":
+                saida = pilha.enter_context(open(args.summary, "a", encoding="utf-8"))
+        except OSError as exc:
+            console.print(f"[red]Erro ao abrir o resumo: {exc}[/red]")
+            return 2
+        try:
+            journal = BatchJournal(args.journal) if args.journal else BatchJournal.for_output_dir(args.output)
+        except (OSError, sqlite3.Error) as exc:
+            console.print(f"[red]Erro ao abrir o diário na pasta de destino: {exc}[/red]")
+            return 2
+        pilha.callback(journal.close)
+        descartes: Counter = Counter()
+        inicio = time.monotonic()
+
+        def emitir(registro: dict) -> None:
+            saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            saida.flush()
+
+        totais = executar_lote(
+            ler_urls(entrada, descartes),
+            args.quality,
+            args.mode,
+            args.workers,
+            args.output,
+            lambda resultado: emitir(resultado.to_dict()),
+            journal,
+        )
+        emitir(
+            {
+                "event": "summary",
+                "total": sum(totais.values()),
+                "done": totais[ITEM_DONE],
+                "failed": totais[ITEM_FAILED],
+                "skipped": totais[ITEM_SKIPPED],
+                "duplicates": descartes[ITEM_DUPLICATE],
+                "seconds": round(time.monotonic() - inicio, 3),
+            }
+        )
+
+    return 1 if totais[ITEM_FAILED] else 0
 
 
 def main():
+    import questionary
+
     while True:
         show_header()
-        
+        startup_profiler.report("menu exibido")
+
         modo = questionary.select(
             "Escolha o modo de operação:",
             choices=[
@@ -175,31 +541,37 @@ def main():
             console.print("[blue]Até logo![/blue]")
             break
 
-        quality_str = questionary.select(
-            "Escolha a qualidade do áudio:",
+        formato_str = questionary.select(
+            "Escolha o formato do áudio:",
             choices=[
-                "128 Kbps (Baixa)",
-                "192 Kbps (Recomendada)",
-                "256 Kbps (Alta)"
+                "MP3 (compatível com tudo)",
+                "M4A (sem reconverter, mais rápido)",
+                "Opus (sem reconverter, mais rápido)"
             ]
         ).ask()
-        
-        quality = int(quality_str.split()[0])
+
+        formato = formato_str.split()[0].lower()
+        quality = 192
+        if formato == "mp3":
+            quality_str = questionary.select(
+                "Escolha a qualidade do áudio:",
+                choices=[
+                    "128 Kbps (Baixa)",
+                    "192 Kbps (Recomendada)",
+                    "256 Kbps (Alta)"
+                ]
+            ).ask()
+
+            quality = int(quality_str.split()[0])
 
         if modo == "Única URL":
             url = questionary.text("Cole a URL do vídeo do YouTube:").ask()
             if url:
-                with Progress(
-                    SpinnerColumn(),
-                    TextColumn("[progress.description]{task.description}"),
-                    BarColumn(),
-                    DownloadColumn(),
-                    TransferSpeedColumn(),
-                    TimeRemainingColumn(),
-                    console=console,
-                ) as progress:
+                with criar_progresso() as progress:
                     task_id = progress.add_task("[cyan]Iniciando...[/cyan]", total=None)
-                    baixar_audio(url, quality, progress, task_id)
+                    conversao = baixar_audio(url, quality, progress, task_id, formato)
+                    if conversao is not None:
+                        conversao.result()
                 
                 input("\nPressione Enter para continuar...")
 
@@ -213,11 +585,13 @@ def main():
             caminho_txt = caminho_txt.replace('"', "").replace("'", "").strip()
             
             if caminho_txt:
-                processar_lista_urls(caminho_txt, quality)
+                processar_lista_urls(caminho_txt, quality, formato)
                 input("\nPressione Enter para continuar...")
 
 if __name__ == "__main__":
     try:
+        if len(sys.argv) > 1:
+            sys.exit(main_cli(sys.argv[1:]))
         main()
     except KeyboardInterrupt:
         console.print("\n[red]Interrompido pelo usuário.[/red]")
@@ -0,0 +1,36 @@
+# Output modes shared by the web app and the CLI.
+
+# FFmpegExtractAudio copies the stream when the source codec already
+# matches, so these modes only remux; other sources still get encoded.
+PASSTHROUGH_AUDIO_MODES = {
+    "m4a": {"format": "bestaudio[ext=m4a]/bestaudio[acodec^=mp4a]/bestaudio/best", "codec": "m4a"},
+    "opus": {"format": "bestaudio[acodec=opus]/bestaudio[ext=webm]/bestaudio/best", "codec": "opus"},
+}
+AUDIO_MODES = ("mp3", *PASSTHROUGH_AUDIO_MODES)
+MP3_QUALITIES = ("128", "192", "256")
+VIDEO_QUALITIES = ("360", "720", "1080")
+
+
+def normalize_mode(mode: str) -> str:
+    return mode if mode in {"mp4", *AUDIO_MODES} else "mp3"
+
+
+def is_audio_mode(mode: str) -> bool:
+    return normalize_mode(mode) != "mp4"
+
+
+def normalize_quality(quality: str) -> str:
+    return quality if quality in MP3_QUALITIES else "192"
+
+
+def normalize_video_quality(video_quality: str) -> str:
+    return video_quality if video_quality in VIDEO_QUALITIES else "720"
+
+
+def output_profile(mode: str, quality: str, video_quality: str) -> str:
+    safe_mode = normalize_mode(mode)
+    if safe_mode in PASSTHROUGH_AUDIO_MODES:
+        return safe_mode
+    if safe_mode == "mp3":
+        return f"mp3-{normalize_quality(quality)}"
+    return f"mp4-{normalize_video_quality(video_quality)}"
@@ -0,0 +1,118 @@
+import sys
+import threading
+import time
+from importlib.abc import MetaPathFinder
+
+PROFILE_STARTUP_FLAG = "--profile-startup"
+REPORT_LIMIT = 25
+
+
+class TimedLoader:
+    # Wraps the real loader only to time exec_module; everything else
+    # (resource readers, get_source, ...) goes straight to the original.
+    def __init__(self, loader, profiler: "StartupProfiler", name: str, started_at: float):
+        self._loader = loader
+        self._profiler = profiler
+        self._name = name
+        self._started_at = started_at
+
+    def __getattr__(self, name: str):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module) -> None:
+        self._profiler._enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._leave(self._name, self._started_at)
+
+
+class TimingFinder(MetaPathFinder):
+    def __init__(self, profiler: "StartupProfiler"):
+        self.profiler = profiler
+
+    def find_spec(self, fullname: str, path, target=None):
+        started_at = time.perf_counter()
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = TimedLoader(spec.loader, self.profiler, fullname, started_at)
+        return spec
+
+
+class StartupProfiler:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.started_at = time.perf_counter()
+        self.imports: list[tuple[str, float, float]] = []
+        self.reported = False
+        self._finder: TimingFinder | None = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_argv(cls, argv: list[str]) -> "StartupProfiler":
+        profiler = cls(PROFILE_STARTUP_FLAG in argv)
+        if profiler.enabled:
+            argv.remove(PROFILE_STARTUP_FLAG)
+            profiler.install()
+        return profiler
+
+    def install(self) -> None:
+        if self._finder is None:
+            self._finder = TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def mark(self, label: str) -> None:
+        if not self.enabled:
+            return
+        print(f"[startup] {self.elapsed_ms():9.1f} ms  {label}", file=sys.stderr, flush=True)
+
+    def report(self, label: str | None = None, limit: int = REPORT_LIMIT) -> None:
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        if label:
+            self.mark(label)
+        with self._lock:
+            imports = sorted(self.imports, key=lambda item: item[1], reverse=True)
+            total_self = sum(self_ms for _, _, self_ms in self.imports)
+
+        lines = [
+            f"[startup] {len(imports)} módulos importados, {total_self:.1f} ms em imports "
+            f"({self.elapsed_ms():.1f} ms desde o início)",
+            f"[startup] {'acumulado':>10} {'próprio':>9}  módulo",
+        ]
+        for name, cumulative_ms, self_ms in imports[:limit]:
+            lines.append(f"[startup] {cumulative_ms:8.1f}ms {self_ms:7.1f}ms  {name}")
+        print("\n".join(lines), file=sys.stderr, flush=True)
+
+    def _children(self) -> list[float]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self) -> None:
+        self._children().append(0.0)
+
+    def _leave(self, name: str, started_at: float) -> None:
+        cumulative_ms = (time.perf_counter() - started_at) * 1000
+        stack = self._children()
+        nested_ms = stack.pop()
+        if stack:
+            stack[-1] += cumulative_ms
+        with self._lock:
+            self.imports.append((name, cumulative_ms, max(cumulative_ms - nested_ms, 0.0)))
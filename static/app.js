@@ -12,38 +12,25 @@ const qualitySelect = document.getElementById("qualitySelect");
 const videoQualityField = document.getElementById("videoQualityField");
 const videoQualityHint = document.getElementById("videoQualityHint");
 const videoQualitySelect = document.getElementById("videoQualitySelect");
+const streamField = document.getElementById("streamField");
+const streamCheckbox = document.getElementById("streamCheckbox");
 const statusMessage = document.getElementById("statusMessage");
 const urlFeedback = document.getElementById("urlFeedback");
 const downloadButton = document.getElementById("downloadButton");
 const btnSpinner = document.getElementById("btnSpinner");
 const btnText = document.getElementById("btnText");
+const downloadProgress = document.getElementById("downloadProgress");
+const progressFill = document.getElementById("progressFill");
+
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_POLL_MAX_FAILURES = 30;
 
 let lastPreviewId = null;
 let previewTimeout = null;
 
-const decodeFileName = (value) => {
-  try {
-    return decodeURIComponent(value);
-  } catch {
-    return value;
-  }
-};
-
-const getDownloadFileName = (disposition, fallbackMode) => {
-  if (disposition) {
-    const filenameStarMatch = disposition.match(/filename\*=UTF-8''([^;]+)/i);
-    if (filenameStarMatch?.[1]) {
-      return decodeFileName(filenameStarMatch[1]);
-    }
-
-    const filenameMatch = disposition.match(/filename="?([^";]+)"?/i);
-    if (filenameMatch?.[1]) {
-      return decodeFileName(filenameMatch[1]);
-    }
-  }
-
-  return fallbackMode === "mp3" ? "download.mp3" : "download.mp4";
-};
+// Streaming only pays off when the bytes go straight to a file; buffering
+// the whole MP3 in memory first would be worse than the normal job flow.
+const canStreamToDisk = typeof window.showSaveFilePicker === "function";
 
 const extractYouTubeId = (url) => {
   if (!url) return null;
@@ -143,16 +130,20 @@ const updatePreview = () => {
 const updateQualityState = () => {
   const mode = document.querySelector("input[name='mode']:checked").value;
   const isMp4 = mode === "mp4";
+  const isMp3 = mode === "mp3";
 
-  qualityField.classList.toggle("hidden", isMp4);
-  qualityField.classList.toggle("disabled", isMp4);
-  qualityHint.style.opacity = isMp4 ? "0" : "1";
-  qualitySelect.disabled = isMp4;
+  qualityField.classList.toggle("hidden", !isMp3);
+  qualityField.classList.toggle("disabled", !isMp3);
+  qualityHint.style.opacity = isMp3 ? "1" : "0";
+  qualitySelect.disabled = !isMp3;
 
   videoQualityField.classList.toggle("hidden", !isMp4);
   videoQualityField.classList.toggle("disabled", !isMp4);
   videoQualityHint.style.opacity = isMp4 ? "1" : "0";
   videoQualitySelect.disabled = !isMp4;
+
+  streamField.classList.toggle("hidden", !isMp3 || !canStreamToDisk);
+  streamCheckbox.disabled = !isMp3 || !canStreamToDisk;
 };
 
 const debouncePreview = () => {
@@ -160,6 +151,161 @@ const debouncePreview = () => {
   previewTimeout = setTimeout(updatePreview, 280);
 };
 
+const formatBytes = (bytes) => {
+  if (!bytes) return "0 MB";
+  const megabytes = bytes / (1024 * 1024);
+  return megabytes >= 1024 ? `${(megabytes / 1024).toFixed(2)} GB` : `${megabytes.toFixed(1)} MB`;
+};
+
+const formatEta = (seconds) => {
+  if (seconds === null || seconds === undefined) return "--:--";
+  const minutes = Math.floor(seconds / 60);
+  const secs = String(Math.floor(seconds % 60)).padStart(2, "0");
+  return `${minutes}:${secs}`;
+};
+
+const setProgress = (job) => {
+  const total = job.total_bytes || 0;
+  const ratio = total ? Math.min(job.downloaded_bytes / total, 1) : 0;
+  const isDownloading = job.phase === "downloading";
+  const isPostprocessing = job.phase === "postprocessing";
+
+  downloadProgress.classList.toggle("show", isDownloading || isPostprocessing);
+  downloadProgress.classList.toggle("indeterminate", !isDownloading || !total);
+  progressFill.style.width = `${Math.round(ratio * 100)}%`;
+
+  if (job.phase === "queued") {
+    setStatus("Na fila de download...", "neutral");
+  } else if (job.phase === "extracting") {
+    setStatus("Extraindo informações do vídeo...", "neutral");
+  } else if (isDownloading) {
+    const percent = total ? `${Math.round(ratio * 100)}% • ` : "";
+    const speed = job.speed ? ` • ${formatBytes(job.speed)}/s` : "";
+    setStatus(
+      `Baixando ${percent}${formatBytes(job.downloaded_bytes)}${speed} • ETA ${formatEta(job.eta)}`,
+      "neutral",
+    );
+  } else if (isPostprocessing) {
+    setStatus("Convertendo com FFmpeg...", "neutral");
+  }
+};
+
+const resetProgress = () => {
+  downloadProgress.classList.remove("show", "indeterminate");
+  progressFill.style.width = "0%";
+};
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const pollJob = async (statusUrl) => {
+  let failures = 0;
+  while (true) {
+    await sleep(JOB_POLL_INTERVAL_MS);
+    const response = await fetch(statusUrl).catch(() => null);
+    if (!response || !response.ok) {
+      const payload = response ? await response.json().catch(() => ({})) : {};
+      if (response?.status === 404 || ++failures >= JOB_POLL_MAX_FAILURES) {
+        throw new Error(payload.error || "Conexão com o servidor perdida durante o download.");
+      }
+      continue;
+    }
+
+    failures = 0;
+    const job = await response.json();
+    if (job.status === "done") return job;
+    if (job.status === "failed") throw new Error(job.error || "Não foi possível concluir o download.");
+    setProgress(job);
+  }
+};
+
+const waitForJob = (queuedJob) =>
+  new Promise((resolve, reject) => {
+    const source = new EventSource(queuedJob.events_url);
+
+    source.addEventListener("progress", (event) => setProgress(JSON.parse(event.data)));
+    source.addEventListener("done", (event) => {
+      source.close();
+      resolve(JSON.parse(event.data));
+    });
+    source.addEventListener("failed", (event) => {
+      source.close();
+      const job = JSON.parse(event.data);
+      reject(new Error(job.error || "Não foi possível concluir o download."));
+    });
+    source.onerror = () => {
+      // A dropped connection (proxy timeout, brief network loss) reconnects
+      // on its own. Once the browser gives up the job may still be running,
+      // so its status endpoint decides the outcome.
+      if (source.readyState !== EventSource.CLOSED) return;
+      pollJob(queuedJob.status_url).then(resolve, reject);
+    };
+  });
+
+const triggerFileDownload = (fileUrl) => {
+  const anchor = document.createElement("a");
+  anchor.href = fileUrl;
+  anchor.download = "";
+  document.body.appendChild(anchor);
+  anchor.click();
+  anchor.remove();
+};
+
+const streamFileName = () => {
+  const title = previewTitle.textContent.trim().replace(/[\\/:*?"<>|]+/g, " ").trim();
+  return `${title || "audio"}.mp3`;
+};
+
+// Fetches the stream instead of pointing a link at it, so the endpoint's
+// JSON errors (400/429/500/502) reach the status line instead of the
+// browser saving them as a broken file. The body is piped into the file
+// the user picked as it arrives.
+const streamMp3 = async (formData) => {
+  // The picker needs the click's user activation, so it opens before any
+  // network round trip.
+  const handle = await window.showSaveFilePicker({
+    suggestedName: streamFileName(),
+    types: [{ description: "MP3", accept: { "audio/mpeg": [".mp3"] } }],
+  });
+
+  const params = new URLSearchParams({ url: formData.get("url"), quality: formData.get("quality") });
+  const response = await fetch(`/api/stream/mp3?${params}`);
+  if (!response.ok) {
+    // Nothing was written: drop the empty file the picker may have created.
+    if (handle.remove) await handle.remove().catch(() => {});
+    const payload = await response.json().catch(() => ({}));
+    const error = new Error(payload.error || "Não foi possível iniciar o streaming.");
+    error.status = response.status;
+    throw error;
+  }
+
+  downloadProgress.classList.add("show", "indeterminate");
+  let received = 0;
+  const counter = new TransformStream({
+    transform(chunk, controller) {
+      received += chunk.length;
+      setStatus(`Convertendo e recebendo MP3: ${formatBytes(received)}`, "neutral");
+      controller.enqueue(chunk);
+    },
+  });
+  await response.body.pipeThrough(counter).pipeTo(await handle.createWritable());
+};
+
+const runDownloadJob = async (formData) => {
+  const response = await fetch("/api/download", {
+    method: "POST",
+    body: formData,
+  });
+
+  const payload = await response.json().catch(() => ({}));
+  if (!response.ok) {
+    throw new Error(payload.error || "Não foi possível iniciar o download.");
+  }
+
+  setProgress(payload);
+  const job = await waitForJob(payload);
+  triggerFileDownload(job.file_url);
+};
+
 downloadForm.addEventListener("submit", async (event) => {
   event.preventDefault();
 
@@ -169,39 +315,34 @@ downloadForm.addEventListener("submit", async (event) => {
     return;
   }
 
+  const formData = new FormData(downloadForm);
   setLoading(true);
   setStatus("Iniciando download...", "neutral");
 
   try {
-    const formData = new FormData(downloadForm);
-    const response = await fetch("/api/download", {
-      method: "POST",
-      body: formData,
-    });
-
-    if (!response.ok) {
-      const payload = await response.json().catch(() => ({}));
-      throw new Error(payload.error || "Não foi possível concluir o download.");
+    if (canStreamToDisk && formData.get("mode") === "mp3" && formData.get("stream")) {
+      try {
+        await streamMp3(formData);
+        setStatus("MP3 convertido via streaming e salvo.", "success");
+        return;
+      } catch (error) {
+        if (error.name === "AbortError") {
+          setStatus("Download cancelado.", "neutral");
+          return;
+        }
+        // All stream slots busy: the queued job flow still gets the file,
+        // through the browser's own download instead of the picked one.
+        if (error.status !== 429) throw error;
+        setStatus(`${error.message} Usando o download normal...`, "neutral");
+      }
     }
 
-    const blob = await response.blob();
-    const disposition = response.headers.get("Content-Disposition") || "";
-    const mode = formData.get("mode") === "mp4" ? "mp4" : "mp3";
-    const fileName = getDownloadFileName(disposition, mode);
-
-    const blobUrl = URL.createObjectURL(blob);
-    const anchor = document.createElement("a");
-    anchor.href = blobUrl;
-    anchor.download = fileName;
-    document.body.appendChild(anchor);
-    anchor.click();
-    anchor.remove();
-    URL.revokeObjectURL(blobUrl);
-
+    await runDownloadJob(formData);
     setStatus("Download concluído com sucesso.", "success");
   } catch (error) {
     setStatus(error.message || "Erro inesperado no download.", "error");
   } finally {
+    resetProgress();
     setLoading(false);
   }
 });
@@ -0,0 +1,133 @@
+import re
+import shutil
+import subprocess
+import sys
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+PROBE_TIMEOUT_SECONDS = 15
+
+# Passthrough modes copy the source stream, so only their container is
+# required up front; MP3 always goes through the LAME encoder.
+MODE_REQUIREMENTS = {
+    "mp3": {"encoders": ("libmp3lame",), "muxers": ("mp3",)},
+    "m4a": {"encoders": (), "muxers": ("ipod",)},
+    "opus": {"encoders": (), "muxers": ("opus",)},
+    "mp4": {"encoders": (), "muxers": ("mp4",)},
+}
+
+VERSION_RE = re.compile(r"version\s+(\S+)")
+
+
+def find_tool(name: str, search_dirs: tuple[Path, ...]) -> str | None:
+    for directory in search_dirs:
+        for filename in (name, f"{name}.exe"):
+            candidate = Path(directory) / filename
+            if candidate.is_file():
+                return str(candidate)
+    return shutil.which(name)
+
+
+def run_tool(path: str, *args: str) -> str:
+    result = subprocess.run(
+        [path, "-hide_banner", *args],
+        capture_output=True,
+        text=True,
+        errors="replace",
+        timeout=PROBE_TIMEOUT_SECONDS,
+        check=True,
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0) if sys.platform == "win32" else 0,
+    )
+    return result.stdout
+
+
+def parse_version(output: str) -> str | None:
+    first_line = output.splitlines()[0] if output else ""
+    match = VERSION_RE.search(first_line)
+    return match.group(1) if match else None
+
+
+def parse_component_list(output: str) -> frozenset[str]:
+    # `-encoders` and `-muxers` print a legend, a dashed separator, then one
+    # "FLAGS name description" row per component.
+    names: set[str] = set()
+    in_table = False
+    for line in output.splitlines():
+        stripped = line.strip()
+        if not in_table:
+            in_table = bool(stripped) and set(stripped) == {"-"}
+            continue
+        parts = stripped.split(None, 2)
+        if len(parts) >= 2:
+            names.update(parts[1].split(","))
+    return frozenset(names)
+
+
+@dataclass(frozen=True)
+class Toolchain:
+    ffmpeg_path: str | None
+    ffprobe_path: str | None
+    version: str | None = None
+    encoders: frozenset[str] = field(default_factory=frozenset)
+    muxers: frozenset[str] = field(default_factory=frozenset)
+    error: str | None = None
+
+    def missing_for(self, mode: str) -> list[str]:
+        if not self.ffmpeg_path:
+            return ["ffmpeg"]
+        if self.error:
+            # The binary exists but could not be inspected; let the job try.
+            return []
+        requirements = MODE_REQUIREMENTS.get(mode, {})
+        missing = [f"encoder {name}" for name in requirements.get("encoders", ()) if name not in self.encoders]
+        missing += [f"muxer {name}" for name in requirements.get("muxers", ()) if name not in self.muxers]
+        return missing
+
+    def to_dict(self) -> dict:
+        return {
+            "ffmpeg": self.ffmpeg_path,
+            "ffprobe": self.ffprobe_path,
+            "version": self.version,
+            "error": self.error,
+            "modes": {
+                mode: {"supported": not missing, "missing": missing}
+                for mode, missing in ((mode, self.missing_for(mode)) for mode in MODE_REQUIREMENTS)
+            },
+        }
+
+
+def probe_toolchain(search_dirs: tuple[Path, ...]) -> Toolchain:
+    ffmpeg_path = find_tool("ffmpeg", search_dirs)
+    ffprobe_path = find_tool("ffprobe", search_dirs)
+    if not ffmpeg_path:
+        return Toolchain(None, ffprobe_path, error="FFmpeg não encontrado no pacote do app ou no PATH.")
+
+    try:
+        return Toolchain(
+            ffmpeg_path,
+            ffprobe_path,
+            version=parse_version(run_tool(ffmpeg_path, "-version")),
+            encoders=parse_component_list(run_tool(ffmpeg_path, "-encoders")),
+            muxers=parse_component_list(run_tool(ffmpeg_path, "-muxers")),
+        )
+    except (OSError, subprocess.SubprocessError) as exc:
+        return Toolchain(ffmpeg_path, ffprobe_path, error=f"Falha ao inspecionar o FFmpeg: {exc}")
+
+
+class ToolchainProbe:
+    def __init__(self, search_dirs: tuple[Path, ...]):
+        self.search_dirs = search_dirs
+        self._result: Toolchain | None = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Toolchain:
+        with self._lock:
+            # A missing FFmpeg is looked up again, so installing it does not
+            # need a restart; a found one is probed exactly once.
+            if self._result is None or self._result.ffmpeg_path is None:
+                self._result = probe_toolchain(self.search_dirs)
+            return self._result
+
+    def warm_up(self) -> None:
+        threading.Thread(target=self.get, name="mediadrop-toolchain-probe", daemon=True).start()
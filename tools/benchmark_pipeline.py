@@ -0,0 +1,503 @@
+from __future__ import annotations
+
+import argparse
+import functools
+import itertools
+import json
+import math
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import uvicorn  # noqa: E402
+import yt_dlp  # noqa: E402
+from yt_dlp.extractor.common import InfoExtractor  # noqa: E402
+
+SCENARIOS = ("preview", "download", "cli", "bandwidth")
+DEFAULT_CONCURRENCY = "1,4"
+DEFAULT_REQUESTS = 8
+DEFAULT_MEDIA_SECONDS = 30
+DEFAULT_BANDWIDTH_LIMIT = "2M"
+POLL_SECONDS = 0.05
+JOB_TIMEOUT_SECONDS = 300
+BENCH_TITLE_PREFIX = "MediaDrop Benchmark"
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+
+def generate_media(ffmpeg_path: str, media_dir: Path, seconds: int) -> dict[str, Path]:
+    media_dir.mkdir(parents=True, exist_ok=True)
+    audio_path = media_dir / "audio.m4a"
+    video_path = media_dir / "video.mp4"
+    base = [ffmpeg_path, "-y", "-hide_banner", "-loglevel", "error"]
+    subprocess.run(
+        [*base, "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}", "-c:a", "aac", "-b:a", "160k", str(audio_path)],
+        check=True,
+    )
+    subprocess.run(
+        [
+            *base,
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc=size=640x360:rate=25:duration={seconds}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            "-an",
+            str(video_path),
+        ],
+        check=True,
+    )
+    return {"audio": audio_path, "video": video_path}
+
+
+def start_media_server(media_dir: Path) -> tuple[ThreadingHTTPServer, str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(media_dir)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def install_stub_extractor(base_url: str, media: dict[str, Path], seconds: int) -> None:
+    audio_size = media["audio"].stat().st_size
+    video_size = media["video"].stat().st_size
+
+    class StubYouTubeIE(InfoExtractor):
+        _VALID_URL = r"https?://(?:www\.|m\.|music\.)?(?:youtube\.com/watch\?v=|youtu\.be/)(?P<id>[A-Za-z0-9_-]{11})"
+        IE_NAME = "mediadrop-benchmark"
+
+        def _real_extract(self, url):
+            video_id = self._match_id(url)
+            return {
+                "id": video_id,
+                "title": f"{BENCH_TITLE_PREFIX} {video_id}",
+                "uploader": "MediaDrop",
+                "duration": seconds,
+                "thumbnail": f"{base_url}/thumbnail.jpg",
+                "formats": [
+                    {
+                        "format_id": "140",
+                        "url": f"{base_url}/audio.m4a",
+                        "ext": "m4a",
+                        "acodec": "mp4a.40.2",
+                        "vcodec": "none",
+                        "abr": 160,
+                        "filesize": audio_size,
+                    },
+                    {
+                        "format_id": "134",
+                        "url": f"{base_url}/video.mp4",
+                        "ext": "mp4",
+                        "vcodec": "avc1.64001e",
+                        "acodec": "none",
+                        "height": 360,
+                        "width": 640,
+                        "filesize": video_size,
+                    },
+                ],
+            }
+
+    real_youtube_dl = yt_dlp.YoutubeDL
+
+    class StubYoutubeDL(real_youtube_dl):
+        def __init__(self, params=None, auto_init=True):
+            # The console progress line would garble the JSON report on stdout.
+            super().__init__({**(params or {}), "noprogress": True}, auto_init=False)
+            self.add_info_extractor(StubYouTubeIE())
+            if auto_init:
+                self.add_default_info_extractors()
+
+    yt_dlp.YoutubeDL = StubYoutubeDL
+
+
+def start_web_server(app) -> tuple[uvicorn.Server, threading.Thread, str]:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    config = uvicorn.Config(app, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Servidor web do benchmark não iniciou.")
+        time.sleep(POLL_SECONDS)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def unique_video_ids(prefix: str):
+    counter = 0
+    lock = threading.Lock()
+
+    def next_id() -> str:
+        nonlocal counter
+        with lock:
+            counter += 1
+            return f"{prefix}{counter:0{11 - len(prefix)}d}"
+
+    return next_id
+
+
+def http_json(method: str, url: str, data: dict | None = None) -> dict:
+    body = urllib.parse.urlencode(data).encode("utf-8") if data is not None else None
+    request = urllib.request.Request(url, data=body, method=method)
+    with urllib.request.urlopen(request, timeout=JOB_TIMEOUT_SECONDS) as response:
+        return json.loads(response.read())
+
+
+def http_drain(url: str) -> int:
+    total = 0
+    with urllib.request.urlopen(url, timeout=JOB_TIMEOUT_SECONDS) as response:
+        while chunk := response.read(256 * 1024):
+            total += len(chunk)
+    return total
+
+
+def preview_operation(base_url: str, next_id):
+    def run() -> None:
+        query = urllib.parse.urlencode({"url": f"https://youtu.be/{next_id()}"})
+        http_json("GET", f"{base_url}/api/preview?{query}")
+
+    return run
+
+
+def run_download_job(base_url: str, video_id: str, mode: str, quality: str, video_quality: str) -> dict:
+    job = http_json(
+        "POST",
+        f"{base_url}/api/download",
+        {"url": f"https://youtu.be/{video_id}", "mode": mode, "quality": quality, "video_quality": video_quality},
+    )
+    deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+    while job["status"] not in {"done", "failed"}:
+        if time.monotonic() > deadline:
+            raise TimeoutError("Job do benchmark excedeu o tempo limite.")
+        time.sleep(POLL_SECONDS)
+        job = http_json("GET", f"{base_url}{job['status_url']}")
+    if job["status"] == "failed":
+        raise RuntimeError(job.get("error") or "Download falhou.")
+    http_drain(f"{base_url}{job['file_url']}")
+    return job
+
+
+def download_operation(base_url: str, next_id, mode: str, quality: str, video_quality: str):
+    def run() -> None:
+        run_download_job(base_url, next_id(), mode, quality, video_quality)
+
+    return run
+
+
+def bandwidth_operation(base_url: str, next_id, quality: str, video_quality: str, source_bytes: dict):
+    # Alternates MP3 and MP4 jobs so both governor classes compete.
+    turns = itertools.count()
+    lock = threading.Lock()
+
+    def run() -> None:
+        job_class, mode = ("audio", "mp3") if next(turns) % 2 == 0 else ("video", "mp4")
+        job = run_download_job(base_url, next_id(), mode, quality, video_quality)
+        with lock:
+            source_bytes[job_class] = source_bytes.get(job_class, 0) + job["downloaded_bytes"]
+
+    return run
+
+
+def sample_governor(governor, stop: threading.Event, samples: dict) -> None:
+    # Keeps the last split seen while audio and video ran together, which
+    # is where the class weights show.
+    while not stop.wait(POLL_SECONDS):
+        class_rates = governor.snapshot()["class_rates"]
+        if len(class_rates) > 1:
+            samples["contended_class_rates"] = class_rates
+
+
+def run_bandwidth_scenario(web_app, base_url: str, next_id, args, concurrency: int) -> dict:
+    from bandwidth import BandwidthGovernor, parse_rate
+
+    limit = parse_rate(args.bandwidth_limit)
+    original = web_app.bandwidth_governor
+    web_app.bandwidth_governor = governor = BandwidthGovernor(total_rate=limit)
+    source_bytes: dict[str, int] = {}
+    samples: dict[str, dict] = {}
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_governor, args=(governor, stop, samples), daemon=True)
+    sampler.start()
+    try:
+        operation = bandwidth_operation(base_url, next_id, args.quality, args.video_quality, source_bytes)
+        result = run_scenario("bandwidth", operation, args.requests, concurrency)
+    finally:
+        stop.set()
+        sampler.join()
+        web_app.bandwidth_governor = original
+
+    total_bytes = sum(source_bytes.values())
+    result["bandwidth"] = {
+        "limit_bytes_per_second": limit,
+        "source_bytes": source_bytes,
+        "observed_bytes_per_second": round(total_bytes / result["wall_seconds"], 1) if result["wall_seconds"] else None,
+        "contended_class_rates": samples.get("contended_class_rates"),
+    }
+    return result
+
+
+def run_cli_scenario(work_dir: Path, next_id, args, concurrency: int) -> dict:
+    # Runs the CLI batch path (executar_lote, as main.py -i does) so the
+    # per-worker YoutubeDL reuse and the journal are part of the numbers.
+    import main as cli
+
+    # Same as main_cli: stdout belongs to the report.
+    cli.console.file = sys.stderr
+    output_dir = work_dir / "cli" / f"c{concurrency:02d}"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    latencies: list[float] = []
+    errors: list[str] = []
+
+    def on_item(item) -> None:
+        if item.status == cli.ITEM_DONE:
+            latencies.append(item.seconds)
+        else:
+            errors.append(item.error or item.status)
+
+    urls = (f"https://youtu.be/{next_id()}" for _ in range(args.requests))
+    journal = cli.BatchJournal.for_output_dir(output_dir)
+    before = resource_snapshot()
+    started_at = time.perf_counter()
+    try:
+        cli.executar_lote(urls, int(args.quality), "mp3", concurrency, str(output_dir), on_item, journal)
+    finally:
+        journal.close()
+    wall_seconds = time.perf_counter() - started_at
+    after = resource_snapshot()
+    return scenario_report("cli", concurrency, args.requests, latencies, errors, wall_seconds, before, after)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float | None:
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile: no interpolation, always an observed value.
+    index = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+def resource_snapshot() -> dict:
+    times = os.times()
+    snapshot = {
+        "cpu_self": times.user + times.system,
+        "cpu_children": times.children_user + times.children_system,
+    }
+    if resource is not None:
+        # ru_maxrss is KiB on Linux and bytes on macOS.
+        scale = 1 if sys.platform == "darwin" else 1024
+        snapshot["peak_rss_self"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        snapshot["peak_rss_children"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return snapshot
+
+
+def run_scenario(name: str, operation, requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors: list[str] = []
+    lock = threading.Lock()
+
+    def timed() -> None:
+        started_at = time.perf_counter()
+        try:
+            operation()
+        except Exception as exc:
+            with lock:
+                errors.append(str(exc))
+            return
+        elapsed = time.perf_counter() - started_at
+        with lock:
+            latencies.append(elapsed)
+
+    before = resource_snapshot()
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(requests):
+            executor.submit(timed)
+    wall_seconds = time.perf_counter() - started_at
+    after = resource_snapshot()
+    return scenario_report(name, concurrency, requests, latencies, errors, wall_seconds, before, after)
+
+
+def scenario_report(
+    name: str,
+    concurrency: int,
+    requests: int,
+    latencies: list[float],
+    errors: list[str],
+    wall_seconds: float,
+    before: dict,
+    after: dict,
+) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "succeeded": len(latencies),
+        "failed": len(errors),
+        "errors": sorted(set(errors))[:5],
+        "wall_seconds": round(wall_seconds, 4),
+        "throughput_per_second": round(len(latencies) / wall_seconds, 4) if wall_seconds > 0 else None,
+        "latency_seconds": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else None,
+            "mean": sum(latencies) / len(latencies) if latencies else None,
+        },
+        "cpu_seconds": {
+            "process": round(after["cpu_self"] - before["cpu_self"], 4),
+            "children": round(after["cpu_children"] - before["cpu_children"], 4),
+        },
+        # Peaks are process-lifetime high-water marks, not per-scenario.
+        "peak_rss_bytes": {
+            "process": after.get("peak_rss_self"),
+            "children": after.get("peak_rss_children"),
+        },
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark offline dos pipelines de preview e download.")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"Cenários separados por vírgula ({', '.join(SCENARIOS)}).",
+    )
+    parser.add_argument("--concurrency", default=DEFAULT_CONCURRENCY, help="Níveis de concorrência, ex.: 1,4,8.")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="Operações por nível de concorrência.")
+    parser.add_argument("--mode", choices=("mp3", "mp4"), default="mp3", help="Modo usado no cenário download.")
+    parser.add_argument("--quality", default="192", help="Bitrate MP3 (kbps).")
+    parser.add_argument("--video-quality", default="360", help="Altura máxima do vídeo no modo mp4.")
+    parser.add_argument("--media-seconds", type=int, default=DEFAULT_MEDIA_SECONDS, help="Duração da mídia sintética.")
+    parser.add_argument(
+        "--bandwidth-limit",
+        default=DEFAULT_BANDWIDTH_LIMIT,
+        help="Limite total do cenário bandwidth (bytes/s; aceita k, M, G).",
+    )
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout).")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = sorted(set(scenarios) - set(SCENARIOS))
+    if unknown:
+        print(f"Cenários desconhecidos: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    concurrency_levels = [max(int(value), 1) for value in args.concurrency.split(",") if value.strip()]
+
+    import web_app
+
+    ffmpeg_path = web_app.get_ffmpeg_path()
+    if not ffmpeg_path:
+        print("FFmpeg não encontrado no pacote do app ou no PATH.", file=sys.stderr)
+        return 1
+
+    work_dir = Path(tempfile.mkdtemp(prefix="mediadrop-bench-"))
+    media_server = web_server = None
+    try:
+        media = generate_media(ffmpeg_path, work_dir / "media", args.media_seconds)
+        media_server, media_url = start_media_server(work_dir / "media")
+        install_stub_extractor(media_url, media, args.media_seconds)
+
+        # Keep the benchmark away from the real job and cache directories,
+        # and let admission control see the whole load.
+        web_app.DOWNLOADS_DIR = work_dir / "web"
+        web_app.JOB_STORE_PATH = work_dir / "jobs.sqlite3"
+        web_app.media_cache = web_app.MediaCache(work_dir / "cache", web_app.MEDIA_CACHE_MAX_BYTES)
+        web_app.admission.max_in_flight = max(concurrency_levels) * 2
+        web_app.admission.max_per_client = max(concurrency_levels) * 2
+
+        if {"preview", "download", "bandwidth"} & set(scenarios):
+            web_server, _, base_url = start_web_server(web_app.app)
+
+        results = []
+        for scenario in scenarios:
+            for concurrency in concurrency_levels:
+                # Fresh ids per run so every operation misses the caches.
+                next_id = unique_video_ids(f"{scenario[:2]}{concurrency:02d}")
+                if scenario == "bandwidth":
+                    results.append(run_bandwidth_scenario(web_app, base_url, next_id, args, concurrency))
+                elif scenario == "cli":
+                    results.append(run_cli_scenario(work_dir, next_id, args, concurrency))
+                else:
+                    if scenario == "preview":
+                        operation = preview_operation(base_url, next_id)
+                    else:
+                        operation = download_operation(base_url, next_id, args.mode, args.quality, args.video_quality)
+                    results.append(run_scenario(scenario, operation, args.requests, concurrency))
+                print(
+                    f"{scenario} c={concurrency}: {results[-1]['throughput_per_second']} op/s, "
+                    f"p95={results[-1]['latency_seconds']['p95']}",
+                    file=sys.stderr,
+                )
+    finally:
+        if web_server is not None:
+            web_server.should_exit = True
+        if media_server is not None:
+            media_server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "revision": git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {
+            "requests": args.requests,
+            "concurrency": concurrency_levels,
+            "mode": args.mode,
+            "quality": args.quality,
+            "video_quality": args.video_quality,
+            "media_seconds": args.media_seconds,
+            "bandwidth_limit": args.bandwidth_limit,
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,100 @@
+import copy
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+TRANSCODE_WORKERS_ENV = "MEDIADROP_TRANSCODE_WORKERS"
+
+
+def default_transcode_workers() -> int:
+    try:
+        configured = int(os.environ.get(TRANSCODE_WORKERS_ENV, "0"))
+    except ValueError:
+        configured = 0
+    return configured if configured > 0 else os.cpu_count() or 1
+
+
+class DeferredPostProcessing:
+    # yt-dlp runs the FFmpeg steps (MP3 encode, MP4 merge) inside
+    # process_info right after the download. Capturing post_process on the
+    # instance lets the download worker hand that CPU work to another pool.
+    def __init__(self, ydl, owns_ydl: bool = True):
+        self.ydl = ydl
+        self.owns_ydl = owns_ydl
+        self.pending: list[tuple[str, dict, dict | None]] = []
+        self._post_process = ydl.post_process
+        ydl.post_process = self._capture
+
+    def _capture(self, filename: str, info: dict, files_to_move: dict | None = None) -> dict:
+        info["filepath"] = filename
+        self.pending.append((filename, info, files_to_move))
+        return info
+
+    def run(self) -> list[dict]:
+        results = []
+        while self.pending:
+            filename, info, files_to_move = self.pending.pop(0)
+            results.append(self._post_process(filename, info, files_to_move))
+        return results
+
+    def take(self) -> "DeferredPostProcessing":
+        # Moves the steps captured so far into their own handle, so a
+        # long-lived ydl can start its next URL while these are converted.
+        taken = copy.copy(self)
+        taken.pending, self.pending = self.pending, []
+        taken.owns_ydl = False
+        return taken
+
+    def close(self) -> None:
+        if self.owns_ydl:
+            self.ydl.close()
+
+
+class TranscodePool:
+    def __init__(self, max_workers: int, max_pending: int | None = None):
+        self.max_workers = max_workers
+        self.max_pending = max_workers if max_pending is None else max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mediadrop-transcode")
+        # Running plus waiting work is bounded, so a full transcode stage
+        # pushes back on the download workers instead of piling up files.
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+
+    @classmethod
+    def from_env(cls) -> "TranscodePool":
+        return cls(default_transcode_workers())
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        self._slots.acquire()
+        with self._lock:
+            self._queued += 1
+        try:
+            return self._executor.submit(self._call, fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "queued": self._queued,
+                "running": self._running,
+            }
+
+    def _call(self, fn: Callable, *args, **kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._slots.release()
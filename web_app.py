@@ -1,19 +1,54 @@
+import asyncio
+import copy
+import functools
+import hashlib
+import importlib
+import io
+import itertools
+import json
+import math
+import os
 import shutil
 import platform
 import re
 import mimetypes
+import sqlite3
+import subprocess
 import sys
-from urllib.parse import urlparse
+import threading
+import time
+import zipfile
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+from email.utils import formatdate
+from urllib.parse import parse_qs, quote, urlparse
 from pathlib import Path
 from uuid import uuid4
 
-import yt_dlp
 from fastapi import BackgroundTasks, FastAPI, Form, Query, Request
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 
 from app_meta import APP_DISPLAY_NAME, APP_VERSION
+from app_paths import get_data_root
+from bandwidth import BandwidthGovernor
+from format_selection import smallest_sufficient_audio
+from job_store import JobStore
+from media_modes import (
+    PASSTHROUGH_AUDIO_MODES,
+    is_audio_mode,
+    normalize_mode,
+    normalize_quality,
+    normalize_video_quality,
+    output_profile,
+)
+from metrics import PROMETHEUS_CONTENT_TYPE, MetricsRegistry
+from toolchain import ToolchainProbe
+from transcode import DeferredPostProcessing, TranscodePool
+from youtube_urls import YOUTUBE_VIDEO_ID_RE, extract_video_id, is_youtube_url
 
 
 def get_runtime_root() -> Path:
@@ -23,56 +58,137 @@ def get_runtime_root() -> Path:
 
 
 APP_ROOT = get_runtime_root()
-DOWNLOADS_DIR = APP_ROOT / "downloads" / "web"
+DATA_ROOT = get_data_root()
+DOWNLOADS_DIR = DATA_ROOT / "web"
+MEDIA_CACHE_DIR = DATA_ROOT / "cache"
+JOB_STORE_PATH = DATA_ROOT / "jobs.sqlite3"
 TEMPLATES_DIR = APP_ROOT / "templates"
 STATIC_DIR = APP_ROOT / "static"
 
-app = FastAPI(title=APP_DISPLAY_NAME, version=APP_VERSION)
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+MAX_DOWNLOAD_WORKERS = 2
+JOB_RETENTION_SECONDS = 60 * 60
+ARTIFACT_CHUNK_BYTES = 256 * 1024
+MAX_IN_FLIGHT_JOBS = 20
+MAX_JOBS_PER_CLIENT = 3
+DEFAULT_RETRY_AFTER_SECONDS = 30
+MAX_RETRY_AFTER_SECONDS = 600
+DRAIN_RATE_WINDOW = 50
+BATCH_MAX_ITEMS = 200
+BATCH_DEFAULT_CONCURRENCY = 2
+PLAYLIST_EXPANSION_WORKERS = 2
+MEDIA_CACHE_MAX_BYTES = 4 * 1024 * 1024 * 1024
+PREVIEW_CACHE_TTL_SECONDS = 10 * 60
+PREVIEW_CACHE_MAX_ENTRIES = 512
+EXTRACTION_CACHE_TTL_SECONDS = 5 * 60
+EXTRACTION_CACHE_MAX_ENTRIES = 64
+MAX_STREAMING_JOBS = 2
+STREAM_CHUNK_BYTES = 64 * 1024
+STREAM_RETRY_AFTER_SECONDS = 10
+STRATEGY_REPROBE_SECONDS = 10 * 60
+STRATEGY_EWMA_ALPHA = 0.3
+PRUNE_INTERVAL_SECONDS = 5 * 60
 
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+toolchain_probe = ToolchainProbe((APP_ROOT / "ffmpeg", Path(__file__).resolve().parent / "ffmpeg"))
 
-YOUTUBE_HOSTS = {
-    "youtube.com",
-    "www.youtube.com",
-    "m.youtube.com",
-    "music.youtube.com",
-    "youtu.be",
-    "www.youtu.be",
-}
 
-ANSI_ESCAPE_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Probe FFmpeg once in the background so the first request does not pay
+    # for spawning it three times.
+    toolchain_probe.warm_up()
+    # Opening the store, scanning the cache and clearing orphaned work
+    # directories is blocking I/O, so it stays off the event loop.
+    await asyncio.to_thread(job_manager.open_store, JOB_STORE_PATH)
+    await asyncio.to_thread(job_manager.recover)
+    pruner = asyncio.create_task(prune_periodically())
+    try:
+        yield
+    finally:
+        pruner.cancel()
 
 
-def sanitize_error_message(message: str) -> str:
-    cleaned = ANSI_ESCAPE_RE.sub("", message)
-    cleaned = " ".join(cleaned.split())
-    return cleaned.strip()
+async def prune_periodically() -> None:
+    # submit() also prunes, but an idle server would otherwise keep finished
+    # artifacts on disk past JOB_RETENTION_SECONDS until the next download.
+    while True:
+        await asyncio.sleep(PRUNE_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(job_manager.prune_expired)
+            await asyncio.to_thread(batch_manager.prune_expired)
+        except Exception:
+            continue
 
 
-def is_youtube_url(url: str) -> bool:
-    try:
-        parsed = urlparse(url)
-    except ValueError:
-        return False
+app = FastAPI(title=APP_DISPLAY_NAME, version=APP_VERSION, lifespan=lifespan)
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
-    if parsed.scheme not in {"http", "https"}:
-        return False
 
-    host = (parsed.netloc or "").lower()
-    return host in YOUTUBE_HOSTS
+@functools.lru_cache(maxsize=None)
+def get_templates():
+    # Jinja2 is imported on first use so the server starts answering
+    # before it loads.
+    from fastapi.templating import Jinja2Templates
 
+    return Jinja2Templates(directory=str(TEMPLATES_DIR))
 
-def normalize_mode(mode: str) -> str:
-    return "mp4" if mode == "mp4" else "mp3"
 
+metrics_registry = MetricsRegistry()
+PREVIEW_REQUESTS = metrics_registry.counter(
+    "mediadrop_preview_requests_total", "Preview lookups by cache result and outcome.", ("cache", "result")
+)
+PREVIEW_SECONDS = metrics_registry.histogram(
+    "mediadrop_preview_duration_seconds", "Preview latency, including coalesced waits.", ("cache",)
+)
+DOWNLOAD_JOBS = metrics_registry.counter(
+    "mediadrop_download_jobs_total", "Finished download jobs.", ("mode", "quality", "result", "cache")
+)
+DOWNLOAD_PHASE_SECONDS = metrics_registry.histogram(
+    "mediadrop_download_phase_duration_seconds",
+    "Time spent per download phase: extract, download, postprocess and send.",
+    ("phase", "mode", "quality"),
+)
+DOWNLOAD_ATTEMPTS = metrics_registry.counter(
+    "mediadrop_download_attempts_total", "yt-dlp attempts per extractor strategy.", ("strategy", "result")
+)
+DOWNLOAD_FALLBACKS = metrics_registry.counter(
+    "mediadrop_download_fallback_attempts_total", "Attempts beyond the first strategy in fetch_media.", ("mode",)
+)
+SOURCE_BYTES = metrics_registry.counter(
+    "mediadrop_source_bytes_total", "Bytes downloaded from the media source.", ("mode", "quality")
+)
+SENT_BYTES = metrics_registry.counter("mediadrop_sent_bytes_total", "Bytes sent to clients.", ("endpoint",))
 
-def normalize_quality(quality: str) -> str:
-    return quality if quality in {"128", "192", "256"} else "192"
+YDL_HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36"
+}
 
+STREAM_AUDIO_FORMAT = "bestaudio[protocol^=http]/best[protocol^=http]"
 
-def normalize_video_quality(video_quality: str) -> str:
-    return video_quality if video_quality in {"360", "720", "1080"} else "720"
+EXTRACTOR_STRATEGIES = {
+    "default": None,
+    "android_web": {"youtube": {"player_client": ["android", "web"]}},
+}
+
+BYTE_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+CONTENT_ERROR_MARKERS = (
+    "private video",
+    "video unavailable",
+    "this video is unavailable",
+    "this video has been removed",
+    "not available in your country",
+    "unsupported url",
+    "is not a valid url",
+    "incomplete youtube id",
+)
+
+ANSI_ESCAPE_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
+
+
+def sanitize_error_message(message: str) -> str:
+    cleaned = ANSI_ESCAPE_RE.sub("", message)
+    cleaned = " ".join(cleaned.split())
+    return cleaned.strip()
 
 
 def format_duration(seconds: int | None) -> str:
@@ -86,19 +202,29 @@ def format_duration(seconds: int | None) -> str:
 
 
 def get_ffmpeg_path() -> str | None:
-    candidates = [
-        APP_ROOT / "ffmpeg" / "ffmpeg",
-        APP_ROOT / "ffmpeg" / "ffmpeg.exe",
-        Path(__file__).resolve().parent / "ffmpeg" / "ffmpeg",
-        Path(__file__).resolve().parent / "ffmpeg" / "ffmpeg.exe",
-    ]
-    for candidate in candidates:
-        if candidate.exists():
-            return str(candidate)
-    return shutil.which("ffmpeg")
+    return toolchain_probe.get().ffmpeg_path
+
+
+def unsupported_mode_response(mode: str) -> JSONResponse | None:
+    toolchain = toolchain_probe.get()
+    missing = toolchain.missing_for(mode)
+    if not missing:
+        return None
+    if not toolchain.ffmpeg_path:
+        message = "FFmpeg não encontrado no pacote do app ou no PATH."
+    else:
+        message = f"O FFmpeg instalado não suporta o formato {mode.upper()} (falta: {', '.join(missing)})."
+    return JSONResponse({"error": message, "toolchain": toolchain.to_dict()}, status_code=500)
 
 
-def build_ydl_options(mode: str, quality: str, video_quality: str, output_dir: Path) -> dict:
+def build_ydl_options(
+    mode: str,
+    quality: str,
+    video_quality: str,
+    output_dir: Path,
+    progress_hooks: list | None = None,
+    postprocessor_hooks: list | None = None,
+) -> dict:
     ffmpeg_path = get_ffmpeg_path()
     if not ffmpeg_path:
         message = "FFmpeg not found in the app package or system PATH."
@@ -114,17 +240,33 @@ def build_ydl_options(mode: str, quality: str, video_quality: str, output_dir: P
         "retries": 3,
         "fragment_retries": 3,
         "skip_unavailable_fragments": True,
+        # A job recovered after a restart reuses its directory, so existing
+        # .part files are continued instead of downloaded again.
+        "continuedl": True,
         "geo_bypass": True,
-        "http_headers": {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36"
-        },
+        "http_headers": dict(YDL_HTTP_HEADERS),
+        "progress_hooks": list(progress_hooks or []),
+        "postprocessor_hooks": list(postprocessor_hooks or []),
     }
 
-    if mode == "mp3":
+    if mode in PASSTHROUGH_AUDIO_MODES:
+        passthrough = PASSTHROUGH_AUDIO_MODES[mode]
+        options.update(
+            {
+                "format": passthrough["format"],
+                "postprocessors": [
+                    {
+                        "key": "FFmpegExtractAudio",
+                        "preferredcodec": passthrough["codec"],
+                    }
+                ],
+            }
+        )
+    elif mode == "mp3":
         safe_quality = normalize_quality(quality)
         options.update(
             {
-                "format": "bestaudio/best",
+                "format": smallest_sufficient_audio(int(safe_quality)),
                 "postprocessors": [
                     {
                         "key": "FFmpegExtractAudio",
@@ -146,39 +288,168 @@ def build_ydl_options(mode: str, quality: str, video_quality: str, output_dir: P
     return options
 
 
-def download_media(url: str, mode: str, quality: str, video_quality: str, output_dir: Path) -> Path:
+@dataclass
+class StrategyStats:
+    name: str
+    extractor_args: dict | None
+    success_rate: float = 1.0
+    latency: float | None = None
+    attempts: int = 0
+    failures: int = 0
+    last_attempt_at: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "success_rate": round(self.success_rate, 3),
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "attempts": self.attempts,
+            "failures": self.failures,
+        }
+
+
+class ExtractionStrategySelector:
+    def __init__(self, strategies: dict[str, dict | None], reprobe_seconds: float, alpha: float):
+        self.reprobe_seconds = reprobe_seconds
+        self.alpha = alpha
+        self._stats = [StrategyStats(name=name, extractor_args=args) for name, args in strategies.items()]
+        self._lock = threading.Lock()
+
+    def _ranked(self) -> list[StrategyStats]:
+        # A strategy with no latency sample yet ranks after the measured ones
+        # at the same success rate; the stable sort keeps the configured order
+        # among the untried.
+        return sorted(
+            self._stats,
+            key=lambda stats: (-stats.success_rate, stats.latency is None, stats.latency or 0.0),
+        )
+
+    def preferred(self) -> StrategyStats:
+        with self._lock:
+            return self._ranked()[0]
+
+    def ordered(self) -> list[StrategyStats]:
+        with self._lock:
+            ranked = self._ranked()
+            now = time.monotonic()
+            # Give one request at a time a chance to re-probe a demoted
+            # strategy, otherwise a recovered client would never win back.
+            for stats in ranked[1:]:
+                if stats.success_rate < ranked[0].success_rate and now - stats.last_attempt_at >= self.reprobe_seconds:
+                    stats.last_attempt_at = now
+                    ranked.remove(stats)
+                    ranked.insert(0, stats)
+                    break
+            return ranked
+
+    def record(self, name: str, succeeded: bool, latency: float) -> None:
+        with self._lock:
+            stats = next(stats for stats in self._stats if stats.name == name)
+            stats.attempts += 1
+            stats.failures += 0 if succeeded else 1
+            stats.last_attempt_at = time.monotonic()
+            stats.success_rate += self.alpha * ((1.0 if succeeded else 0.0) - stats.success_rate)
+            if succeeded:
+                stats.latency = latency if stats.latency is None else stats.latency + self.alpha * (latency - stats.latency)
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [stats.to_dict() for stats in self._ranked()]
+
+
+strategy_selector = ExtractionStrategySelector(EXTRACTOR_STRATEGIES, STRATEGY_REPROBE_SECONDS, STRATEGY_EWMA_ALPHA)
+
+
+@dataclass
+class CachedExtraction:
+    strategy: str
+    info: dict
+
+
+def with_strategy(options: dict, strategy: StrategyStats) -> dict:
+    if strategy.extractor_args is None:
+        return dict(options)
+    return {**options, "extractor_args": strategy.extractor_args}
+
+
+def is_content_error(exc: Exception) -> bool:
+    # Errors about the video itself fail the same way with every player
+    # client, so they say nothing about the strategy and stop the fallbacks.
+    from yt_dlp.utils import GeoRestrictedError, UnsupportedError
+
+    exc_info = getattr(exc, "exc_info", None)
+    cause = exc_info[1] if exc_info else exc
+    if isinstance(cause, (GeoRestrictedError, UnsupportedError)):
+        return True
+    message = str(exc).lower()
+    return any(marker in message for marker in CONTENT_ERROR_MARKERS)
+
+
+def fetch_media(
+    url: str,
+    mode: str,
+    quality: str,
+    video_quality: str,
+    output_dir: Path,
+    progress_hooks: list | None = None,
+    postprocessor_hooks: list | None = None,
+    extraction: CachedExtraction | None = None,
+) -> DeferredPostProcessing:
+    # yt-dlp is imported inside each function that needs it, not at module
+    # level, so the server starts answering before it loads.
+    import yt_dlp
+
     output_dir.mkdir(parents=True, exist_ok=True)
     options = build_ydl_options(
         normalize_mode(mode),
         normalize_quality(quality),
         normalize_video_quality(video_quality),
         output_dir,
+        progress_hooks=progress_hooks,
+        postprocessor_hooks=postprocessor_hooks,
     )
 
-    attempts = [
-        options,
-        {
-            **options,
-            "extractor_args": {
-                "youtube": {
-                    "player_client": ["android", "web"],
-                }
-            },
-        },
-    ]
-
     last_error: Exception | None = None
-    for attempt_options in attempts:
+    for attempt_number, strategy in enumerate(strategy_selector.ordered()):
+        if attempt_number:
+            DOWNLOAD_FALLBACKS.inc(mode=normalize_mode(mode))
+        started_at = time.monotonic()
+        first_byte_at: list[float] = []
+
+        def mark_first_byte(data: dict, first_byte_at=first_byte_at) -> None:
+            if not first_byte_at and data["status"] == "downloading":
+                first_byte_at.append(time.monotonic())
+
+        attempt_options = with_strategy(options, strategy)
+        attempt_options["progress_hooks"] = [mark_first_byte, *attempt_options["progress_hooks"]]
+        deferred = DeferredPostProcessing(yt_dlp.YoutubeDL(attempt_options))
         try:
-            with yt_dlp.YoutubeDL(attempt_options) as ydl:
-                ydl.extract_info(url, download=True)
-            last_error = None
-            break
+            if extraction is not None and extraction.strategy == strategy.name:
+                deferred.ydl.process_ie_result(copy.deepcopy(extraction.info), download=True)
+            else:
+                deferred.ydl.extract_info(url, download=True)
         except Exception as exc:
+            deferred.close()
+            DOWNLOAD_ATTEMPTS.inc(strategy=strategy.name, result="error")
             last_error = exc
+            if is_content_error(exc):
+                break
+            strategy_selector.record(strategy.name, False, time.monotonic() - started_at)
+            continue
+
+        DOWNLOAD_ATTEMPTS.inc(strategy=strategy.name, result="ok")
+        finished_at = first_byte_at[0] if first_byte_at else time.monotonic()
+        strategy_selector.record(strategy.name, True, finished_at - started_at)
+        return deferred
 
-    if last_error is not None:
-        raise RuntimeError(sanitize_error_message(str(last_error))) from last_error
+    raise RuntimeError(sanitize_error_message(str(last_error))) from last_error
+
+
+def finish_media(deferred: DeferredPostProcessing, output_dir: Path) -> Path:
+    try:
+        deferred.run()
+    finally:
+        deferred.close()
 
     files = sorted(output_dir.glob("*"), key=lambda p: p.stat().st_mtime, reverse=True)
     if not files:
@@ -187,28 +458,1343 @@ def download_media(url: str, mode: str, quality: str, video_quality: str, output
     return files[0]
 
 
+class TTLCache:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func):
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+preview_cache = TTLCache(PREVIEW_CACHE_TTL_SECONDS, PREVIEW_CACHE_MAX_ENTRIES)
+preview_flight = SingleFlight()
+extraction_cache = TTLCache(EXTRACTION_CACHE_TTL_SECONDS, EXTRACTION_CACHE_MAX_ENTRIES)
+
+
+def pick_thumbnail(info: dict) -> str | None:
+    if info.get("thumbnail"):
+        return info["thumbnail"]
+    thumbnails = [thumb for thumb in info.get("thumbnails") or [] if thumb.get("url")]
+    if not thumbnails:
+        return None
+    thumbnails.sort(key=lambda thumb: (thumb.get("preference") or 0, thumb.get("width") or 0, thumb.get("height") or 0))
+    return thumbnails[-1]["url"]
+
+
+def get_cached_extraction(url: str) -> CachedExtraction | None:
+    video_id = extract_video_id(url)
+    return extraction_cache.get(video_id) if video_id else None
+
+
+def fetch_preview_data(url: str) -> dict:
+    import yt_dlp
+
+    strategy = strategy_selector.preferred()
+    options = with_strategy(
+        {
+            "quiet": True,
+            "no_warnings": True,
+            "skip_download": True,
+            "noplaylist": True,
+            "http_headers": dict(YDL_HTTP_HEADERS),
+        },
+        strategy,
+    )
+
+    with yt_dlp.YoutubeDL(options) as ydl:
+        info = ydl.extract_info(url, download=False, process=False)
+        video_id = extract_video_id(url)
+        if info.get("_type", "video") == "video":
+            if video_id and info.get("id") == video_id:
+                extraction_cache.set(video_id, CachedExtraction(strategy=strategy.name, info=info))
+        else:
+            info = ydl.process_ie_result(info, download=False)
+
+    return {
+        "title": info.get("title") or "Sem título",
+        "channel": info.get("uploader") or "Canal desconhecido",
+        "duration": format_duration(info.get("duration")),
+        "thumbnail": pick_thumbnail(info),
+    }
+
+
 def get_preview_data(url: str) -> dict:
+    started_at = time.perf_counter()
+    key = extract_video_id(url) or url
+    cached = preview_cache.get(key)
+    if cached is not None:
+        PREVIEW_REQUESTS.inc(cache=CACHE_HIT, result="ok")
+        PREVIEW_SECONDS.observe(time.perf_counter() - started_at, cache=CACHE_HIT)
+        return cached
+
+    def load() -> dict:
+        data = preview_cache.get(key)
+        if data is None:
+            data = fetch_preview_data(url)
+            preview_cache.set(key, data)
+        return data
+
+    try:
+        data = preview_flight.do(key, load)
+    except Exception:
+        PREVIEW_REQUESTS.inc(cache=CACHE_MISS, result="error")
+        raise
+    PREVIEW_REQUESTS.inc(cache=CACHE_MISS, result="ok")
+    PREVIEW_SECONDS.observe(time.perf_counter() - started_at, cache=CACHE_MISS)
+    return data
+
+
+@dataclass
+class MediaCacheEntry:
+    key: str
+    path: Path
+    size: int
+
+
+class MediaCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, MediaCacheEntry] = OrderedDict()
+        self._pins: Counter[str] = Counter()
+        self._total_bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(video_id: str, mode: str, quality: str, video_quality: str) -> str:
+        raw = f"{video_id}|{output_profile(mode, quality, video_quality)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def get(self, key: str) -> Path | None:
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not entry.path.exists():
+                self._forget(key)
+                return None
+            self._entries.move_to_end(key)
+            self._pins[key] += 1
+        os.utime(entry.path, None)
+        return entry.path
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            return entry is not None and entry.path.exists()
+
+    def put(self, key: str, source: Path) -> Path | None:
+        size = source.stat().st_size
+        if size > self.max_bytes:
+            return None
+
+        with self._lock:
+            self._load()
+            existing = self._entries.get(key)
+            if existing is not None and existing.path.exists():
+                self._entries.move_to_end(key)
+                self._pins[key] += 1
+                return existing.path
+
+            target_dir = self.root / key
+            shutil.rmtree(target_dir, ignore_errors=True)
+            target_dir.mkdir(parents=True, exist_ok=True)
+            target = Path(shutil.move(str(source), str(target_dir / source.name)))
+            self._entries[key] = MediaCacheEntry(key=key, path=target, size=size)
+            self._total_bytes += size
+            self._pins[key] += 1
+            self._evict()
+        return target
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._pins[key] -= 1
+            if self._pins[key] <= 0:
+                del self._pins[key]
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.root.exists():
+            return
+
+        found = []
+        for entry_dir in self.root.iterdir():
+            files = [path for path in entry_dir.glob("*") if path.is_file()] if entry_dir.is_dir() else []
+            if len(files) != 1:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            stat = files[0].stat()
+            found.append((stat.st_mtime, MediaCacheEntry(key=entry_dir.name, path=files[0], size=stat.st_size)))
+
+        for _, entry in sorted(found, key=lambda item: item[0]):
+            self._entries[entry.key] = entry
+            self._total_bytes += entry.size
+        self._evict()
+
+    def _evict(self) -> None:
+        for key in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if self._pins[key] > 0:
+                continue
+            entry = self._forget(key)
+            shutil.rmtree(entry.path.parent, ignore_errors=True)
+
+    def _forget(self, key: str) -> MediaCacheEntry:
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+        return entry
+
+
+media_cache = MediaCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES)
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+PHASE_QUEUED = "queued"
+PHASE_EXTRACTING = "extracting"
+PHASE_DOWNLOADING = "downloading"
+PHASE_POSTPROCESSING = "postprocessing"
+
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+CACHE_BYPASS = "bypass"
+
+JOB_EVENTS_POLL_SECONDS = 0.25
+JOB_EVENTS_KEEPALIVE_SECONDS = 15.0
+
+
+@dataclass
+class DownloadJob:
+    id: str
+    url: str
+    mode: str
+    quality: str
+    video_quality: str
+    output_dir: Path
+    client_id: str | None = None
+    status: str = JOB_QUEUED
+    phase: str = PHASE_QUEUED
+    downloaded_bytes: int = 0
+    total_bytes: int | None = None
+    speed: float | None = None
+    eta: int | None = None
+    postprocessor: str | None = None
+    cache_key: str | None = None
+    cache_status: str = CACHE_BYPASS
+    cached: bool = False
+    file_path: Path | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    version: int = 0
+    started_at: float | None = None
+    first_byte_at: float | None = None
+    postprocess_started_at: float | None = None
+    on_finished: Callable[["DownloadJob"], None] | None = field(default=None, repr=False)
+    _finished_file_bytes: int = 0
+
+    def update(self, **changes) -> None:
+        for name, value in changes.items():
+            setattr(self, name, value)
+        self.version += 1
+
+    def progress_hook(self, data: dict) -> None:
+        downloaded = data.get("downloaded_bytes") or 0
+        total = data.get("total_bytes") or data.get("total_bytes_estimate")
+        if data["status"] == "downloading":
+            if self.first_byte_at is None:
+                self.first_byte_at = time.monotonic()
+            self.update(
+                phase=PHASE_DOWNLOADING,
+                downloaded_bytes=self._finished_file_bytes + downloaded,
+                total_bytes=self._finished_file_bytes + total if total else None,
+                speed=data.get("speed"),
+                eta=data.get("eta"),
+            )
+        elif data["status"] == "finished":
+            self._finished_file_bytes += total or downloaded
+            self.update(downloaded_bytes=self._finished_file_bytes, speed=None, eta=0)
+
+    def postprocessor_hook(self, data: dict) -> None:
+        if data["status"] == "started":
+            if self.postprocess_started_at is None:
+                self.postprocess_started_at = time.monotonic()
+            self.update(phase=PHASE_POSTPROCESSING, postprocessor=data.get("postprocessor"))
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in {JOB_DONE, JOB_FAILED}
+
+    @property
+    def metric_labels(self) -> dict:
+        return {
+            "mode": self.mode,
+            "quality": {"mp3": self.quality, "mp4": f"{self.video_quality}p"}.get(self.mode, "original"),
+        }
+
+    def record_metrics(self) -> None:
+        labels = self.metric_labels
+        DOWNLOAD_JOBS.inc(result=self.status, cache=self.cache_status, **labels)
+        if self.started_at is None:
+            return
+
+        ended_at = time.monotonic()
+        download_ended_at = self.postprocess_started_at or ended_at
+        DOWNLOAD_PHASE_SECONDS.observe((self.first_byte_at or download_ended_at) - self.started_at, phase="extract", **labels)
+        if self.first_byte_at is not None:
+            DOWNLOAD_PHASE_SECONDS.observe(download_ended_at - self.first_byte_at, phase="download", **labels)
+        if self.postprocess_started_at is not None:
+            DOWNLOAD_PHASE_SECONDS.observe(ended_at - self.postprocess_started_at, phase="postprocess", **labels)
+        SOURCE_BYTES.inc(self.downloaded_bytes, **labels)
+
+    def to_record(self) -> dict:
+        return {
+            "id": self.id,
+            "url": self.url,
+            "mode": self.mode,
+            "quality": self.quality,
+            "video_quality": self.video_quality,
+            "client_id": self.client_id,
+            "status": self.status,
+            "phase": self.phase,
+            "output_dir": str(self.output_dir),
+            "file_path": str(self.file_path) if self.file_path else None,
+            "cache_key": self.cache_key,
+            "cache_status": self.cache_status,
+            "cached": int(self.cached),
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_record(cls, record: dict) -> "DownloadJob":
+        return cls(
+            id=record["id"],
+            url=record["url"],
+            mode=record["mode"],
+            quality=record["quality"],
+            video_quality=record["video_quality"],
+            output_dir=Path(record["output_dir"]),
+            client_id=record["client_id"],
+            status=record["status"],
+            phase=record["phase"],
+            cache_key=record["cache_key"],
+            cache_status=record["cache_status"],
+            cached=bool(record["cached"]),
+            file_path=Path(record["file_path"]) if record["file_path"] else None,
+            error=record["error"],
+            created_at=record["created_at"],
+            finished_at=record["finished_at"],
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "mode": self.mode,
+            "quality": self.quality,
+            "video_quality": self.video_quality,
+            "phase": self.phase,
+            "downloaded_bytes": self.downloaded_bytes,
+            "total_bytes": self.total_bytes,
+            "speed": self.speed,
+            "eta": self.eta,
+            "postprocessor": self.postprocessor,
+            "cache": self.cache_status,
+            "filename": self.file_path.name if self.file_path else None,
+            "error": self.error,
+            "status_url": f"/api/jobs/{self.id}",
+            "events_url": f"/api/jobs/{self.id}/events",
+            "file_url": f"/api/jobs/{self.id}/file",
+        }
+
+
+class DownloadJobManager:
+    def __init__(
+        self,
+        max_workers: int,
+        retention_seconds: float,
+        transcoder: TranscodePool,
+        store: JobStore | None = None,
+    ):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mediadrop-download")
+        self._transcoder = transcoder
+        self._store = store
+        self._jobs: dict[str, DownloadJob] = {}
+        self._completions: deque[float] = deque(maxlen=DRAIN_RATE_WINDOW)
+        self._recovered = False
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        url: str,
+        mode: str,
+        quality: str,
+        video_quality: str,
+        on_finished: Callable[[DownloadJob], None] | None = None,
+        client_id: str | None = None,
+    ) -> DownloadJob:
+        self.prune_expired()
+        job_id = str(uuid4())
+        job = DownloadJob(
+            id=job_id,
+            url=url,
+            mode=normalize_mode(mode),
+            quality=normalize_quality(quality),
+            video_quality=normalize_video_quality(video_quality),
+            output_dir=DOWNLOADS_DIR / job_id,
+            client_id=client_id,
+            on_finished=on_finished,
+        )
+        video_id = extract_video_id(url)
+        if video_id:
+            job.cache_key = MediaCache.make_key(video_id, job.mode, job.quality, job.video_quality)
+            job.cache_status = CACHE_MISS
+
+        with self._lock:
+            self._jobs[job_id] = job
+
+        cached_path = media_cache.get(job.cache_key) if job.cache_key else None
+        if cached_path is not None:
+            job.update(
+                status=JOB_DONE,
+                phase=JOB_DONE,
+                cache_status=CACHE_HIT,
+                cached=True,
+                file_path=cached_path,
+                finished_at=time.time(),
+            )
+            self._persist(job)
+            job.record_metrics()
+            self._notify_finished(job)
+            return job
+
+        self._persist(job)
+        self._executor.submit(self._run, job)
+        return job
+
+    def open_store(self, path: Path) -> None:
+        # Opened from the lifespan hook rather than at import, so a data
+        # directory that cannot be created only disables persistence.
+        with self._lock:
+            if self._store is not None:
+                return
+        try:
+            store = JobStore(path)
+        except (OSError, sqlite3.Error):
+            return
+        with self._lock:
+            self._store = store
+
+    def recover(self) -> None:
+        # Runs once per process: the launcher may restart the server without
+        # reloading this module, and those jobs are still in memory.
+        with self._lock:
+            if self._recovered or self._store is None:
+                return
+            self._recovered = True
+            known = set(self._jobs)
+
+        try:
+            records = self._store.load_all()
+        except sqlite3.Error:
+            return
+
+        cutoff = time.time() - self.retention_seconds
+        for record in records:
+            if record["id"] in known:
+                continue
+            job = DownloadJob.from_record(record)
+            if job.is_finished:
+                expired = job.finished_at is not None and job.finished_at < cutoff
+                if expired or (job.status == JOB_DONE and not self._reclaim_file(job)):
+                    self._forget(job)
+                    continue
+                with self._lock:
+                    self._jobs[job.id] = job
+                continue
+
+            # Queued or interrupted mid-download/conversion: run it again in
+            # the same directory, where yt-dlp continues the .part files.
+            job.update(status=JOB_QUEUED, phase=PHASE_QUEUED)
+            with self._lock:
+                self._jobs[job.id] = job
+            self._persist(job)
+            self._executor.submit(self._run, job)
+
+    def get(self, job_id: str) -> DownloadJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def in_flight(self) -> list[DownloadJob]:
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if not job.is_finished]
+        return sorted(jobs, key=lambda job: job.created_at)
+
+    def drain_rate(self) -> float | None:
+        with self._lock:
+            completions = list(self._completions)
+        if len(completions) < 2:
+            return None
+        elapsed = time.monotonic() - completions[0]
+        return (len(completions) - 1) / elapsed if elapsed > 0 else None
+
+    def discard(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            self._forget(job)
+            if job.cached:
+                media_cache.release(job.cache_key)
+
+    def prune_expired(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job.id for job in self._jobs.values() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            self.discard(job_id)
+
+    def _run(self, job: DownloadJob) -> None:
+        job.started_at = time.monotonic()
+        job.update(status=JOB_RUNNING, phase=PHASE_EXTRACTING)
+        self._persist(job)
+        with bandwidth_governor.register("audio" if is_audio_mode(job.mode) else "video") as lease:
+            try:
+                deferred = fetch_media(
+                    job.url,
+                    job.mode,
+                    job.quality,
+                    job.video_quality,
+                    job.output_dir,
+                    progress_hooks=[lease.progress_hook, job.progress_hook],
+                    postprocessor_hooks=[job.postprocessor_hook],
+                    extraction=get_cached_extraction(job.url),
+                )
+            except Exception as exc:
+                self._fail(job, exc)
+                return
+
+        # The download slot is free once the raw streams are on disk; FFmpeg
+        # runs on the transcode pool, which blocks here when it is full.
+        job.postprocess_started_at = time.monotonic()
+        job.update(phase=PHASE_POSTPROCESSING, postprocessor=None)
+        self._persist(job)
+        try:
+            self._transcoder.submit(self._transcode, job, deferred)
+        except Exception as exc:
+            deferred.close()
+            self._fail(job, exc)
+
+    def _transcode(self, job: DownloadJob, deferred: DeferredPostProcessing) -> None:
+        try:
+            file_path = finish_media(deferred, job.output_dir)
+            cached_path = media_cache.put(job.cache_key, file_path) if job.cache_key else None
+            if cached_path is not None:
+                shutil.rmtree(job.output_dir, ignore_errors=True)
+                file_path = cached_path
+        except Exception as exc:
+            self._fail(job, exc)
+            return
+
+        job.update(
+            status=JOB_DONE,
+            phase=JOB_DONE,
+            cached=cached_path is not None,
+            file_path=file_path,
+            finished_at=time.time(),
+        )
+        self._finish(job)
+
+    def _fail(self, job: DownloadJob, exc: Exception) -> None:
+        shutil.rmtree(job.output_dir, ignore_errors=True)
+        job.update(
+            status=JOB_FAILED,
+            phase=JOB_FAILED,
+            error=f"Falha no download: {sanitize_error_message(str(exc))}",
+            finished_at=time.time(),
+        )
+        self._finish(job)
+
+    def _finish(self, job: DownloadJob) -> None:
+        self._persist(job)
+        with self._lock:
+            self._completions.append(time.monotonic())
+        job.record_metrics()
+        self._notify_finished(job)
+
+    def _reclaim_file(self, job: DownloadJob) -> bool:
+        if job.cached:
+            # Pin the cache entry again; discard() releases it as usual.
+            cached_path = media_cache.get(job.cache_key) if job.cache_key else None
+            if cached_path is None:
+                job.cached = False
+                return False
+            job.file_path = cached_path
+            return True
+        return job.file_path is not None and job.file_path.exists()
+
+    def _forget(self, job: DownloadJob) -> None:
+        shutil.rmtree(job.output_dir, ignore_errors=True)
+        if self._store is not None:
+            try:
+                self._store.delete(job.id)
+            except sqlite3.Error:
+                pass
+
+    def _persist(self, job: DownloadJob) -> None:
+        # Losing the store must not fail the download itself.
+        if self._store is None:
+            return
+        try:
+            self._store.save(job.to_record())
+        except sqlite3.Error:
+            pass
+
+    @staticmethod
+    def _notify_finished(job: DownloadJob) -> None:
+        if job.on_finished is None:
+            return
+        try:
+            job.on_finished(job)
+        except Exception:
+            pass
+
+
+bandwidth_governor = BandwidthGovernor.from_env()
+transcode_pool = TranscodePool.from_env()
+job_manager = DownloadJobManager(MAX_DOWNLOAD_WORKERS, JOB_RETENTION_SECONDS, transcode_pool)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        jobs: DownloadJobManager,
+        batches: "DownloadBatchManager",
+        max_in_flight: int,
+        max_per_client: int,
+    ):
+        self.jobs = jobs
+        self.batches = batches
+        self.max_in_flight = max_in_flight
+        self.max_per_client = max_per_client
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def admit(self, client_id: str, slots: int = 1):
+        # Held across the caller's submit so two requests cannot both take
+        # the last free slot.
+        with self._lock:
+            self.check(client_id, slots)
+            yield
+
+    def in_flight(self) -> list[tuple[float, str | None]]:
+        # One (created_at, client_id) entry per occupied slot, oldest first.
+        # A batch holds its slots from admission until it finishes, even
+        # while its playlist is still being read and before its jobs exist;
+        # its jobs are covered by that reservation rather than counted again.
+        batches = self.batches.active()
+        batch_job_ids = {job_id for batch in batches for job_id in batch.job_ids()}
+        entries = [(job.created_at, job.client_id) for job in self.jobs.in_flight() if job.id not in batch_job_ids]
+        for batch in batches:
+            entries.extend([(batch.created_at, batch.client_id)] * batch.reserved_slots)
+        return sorted(entries, key=lambda entry: entry[0])
+
+    def check(self, client_id: str, slots: int = 1) -> None:
+        in_flight = self.in_flight()
+        excess = len(in_flight) + slots - self.max_in_flight
+        if excess > 0:
+            raise AdmissionRejected(
+                "Servidor ocupado: fila de downloads cheia. Tente novamente em instantes.",
+                self.retry_after(excess),
+            )
+
+        client_positions = [index for index, (_, owner) in enumerate(in_flight) if owner == client_id]
+        client_excess = len(client_positions) + slots - self.max_per_client
+        if client_excess > 0:
+            # In FIFO order this client's n-th oldest job frees a slot once
+            # everything queued ahead of it has drained.
+            position = client_positions[client_excess - 1] + 1
+            raise AdmissionRejected(
+                f"Limite de {self.max_per_client} downloads simultâneos por usuário atingido.",
+                self.retry_after(position),
+            )
+
+    def retry_after(self, jobs_to_drain: int) -> int:
+        rate = self.jobs.drain_rate()
+        if not rate:
+            return DEFAULT_RETRY_AFTER_SECONDS
+        return max(1, min(math.ceil(jobs_to_drain / rate), MAX_RETRY_AFTER_SECONDS))
+
+    def snapshot(self) -> dict:
+        in_flight = self.in_flight()
+        jobs = self.jobs.in_flight()
+        running = sum(1 for job in jobs if job.status == JOB_RUNNING)
+        rate = self.jobs.drain_rate()
+        return {
+            "in_flight": len(in_flight),
+            "queued": len(jobs) - running,
+            "running": running,
+            "capacity": self.max_in_flight,
+            "saturation": round(len(in_flight) / self.max_in_flight, 3),
+            "saturated": len(in_flight) >= self.max_in_flight,
+            "drain_rate_per_minute": round(rate * 60, 2) if rate else None,
+        }
+
+
+def collect_job_counts() -> dict[tuple[str, ...], float]:
+    snapshot = admission.snapshot()
+    return {("running",): snapshot["running"], ("queued",): snapshot["queued"]}
+
+
+def directory_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += (Path(root) / name).stat().st_size
+            except OSError:
+                continue
+    return total
+
+
+def collect_disk_usage() -> dict[tuple[str, ...], float]:
+    return {("cache",): directory_size(MEDIA_CACHE_DIR), ("jobs",): directory_size(DOWNLOADS_DIR)}
+
+
+metrics_registry.gauge("mediadrop_jobs", "Download jobs currently in flight, by state.", ("state",), collect_job_counts)
+metrics_registry.gauge(
+    "mediadrop_transcode_jobs",
+    "FFmpeg post-processing work on the transcode pool, by state.",
+    ("state",),
+    lambda: {(state,): transcode_pool.snapshot()[state] for state in ("queued", "running")},
+)
+metrics_registry.gauge(
+    "mediadrop_strategy_success_rate",
+    "Smoothed success rate of each yt-dlp player-client strategy.",
+    ("strategy",),
+    lambda: {(stats["name"],): stats["success_rate"] for stats in strategy_selector.snapshot()},
+)
+metrics_registry.gauge(
+    "mediadrop_temp_disk_bytes", "Disk used by job scratch directories and the media cache.", ("area",), collect_disk_usage
+)
+
+
+def client_identity(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def rejection_response(rejection: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        {"error": rejection.message, "retry_after": rejection.retry_after},
+        status_code=429,
+        headers={"Retry-After": str(rejection.retry_after)},
+    )
+
+
+BATCH_EXPANDING = "expanding"
+BATCH_ITEM_PENDING = "pending"
+BATCH_ITEM_INVALID = "invalid"
+
+
+@dataclass
+class BatchItem:
+    url: str
+    job: DownloadJob | None = None
+    error: str | None = None
+
+    @property
+    def status(self) -> str:
+        if self.job is not None:
+            return self.job.status
+        return BATCH_ITEM_INVALID if self.error else BATCH_ITEM_PENDING
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in {JOB_DONE, JOB_FAILED, BATCH_ITEM_INVALID}
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "status": self.status,
+            "error": self.job.error if self.job is not None else self.error,
+            "job": self.job.to_dict() if self.job is not None else None,
+        }
+
+
+@dataclass
+class DownloadBatch:
+    id: str
+    mode: str
+    quality: str
+    video_quality: str
+    max_parallel: int
+    client_id: str | None
+    items: list[BatchItem] = field(default_factory=list)
+    pending: deque = field(default_factory=deque, repr=False)
+    expanding: bool = False
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    @property
+    def status(self) -> str:
+        if self.expanding:
+            return BATCH_EXPANDING
+        if self.error is not None:
+            return JOB_FAILED
+        return JOB_DONE if self.is_finished else JOB_RUNNING
+
+    @property
+    def is_finished(self) -> bool:
+        if self.expanding:
+            return False
+        return self.error is not None or all(item.is_finished for item in self.items)
+
+    @property
+    def reserved_slots(self) -> int:
+        if self.expanding:
+            return self.max_parallel
+        if self.error is not None:
+            return 0
+        return min(self.max_parallel, sum(1 for item in self.items if not item.is_finished))
+
+    def job_ids(self) -> list[str]:
+        return [item.job.id for item in self.items if item.job is not None]
+
+    def to_dict(self) -> dict:
+        counts = Counter(item.status for item in self.items)
+        return {
+            "id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "mode": self.mode,
+            "quality": self.quality,
+            "video_quality": self.video_quality,
+            "max_parallel": self.max_parallel,
+            "total": len(self.items),
+            "counts": dict(counts),
+            "items": [item.to_dict() for item in self.items],
+            "status_url": f"/api/batches/{self.id}",
+            "zip_url": f"/api/batches/{self.id}/zip",
+        }
+
+
+def clamp_batch_concurrency(value: int) -> int:
+    # Batch jobs share the download pool with single downloads, so asking
+    # for more than MAX_DOWNLOAD_WORKERS would only queue them, while still
+    # counting them against the admission limits.
+    return max(1, min(value, MAX_DOWNLOAD_WORKERS))
+
+
+class DownloadBatchManager:
+    def __init__(self, jobs: DownloadJobManager, retention_seconds: float, max_items: int):
+        self.jobs = jobs
+        self.retention_seconds = retention_seconds
+        self.max_items = max_items
+        self._batches: dict[str, DownloadBatch] = {}
+        self._lock = threading.RLock()
+        self._filling: set[str] = set()
+        # Playlist reads get their own threads so they never hold one of
+        # the download workers.
+        self._expander = ThreadPoolExecutor(
+            max_workers=PLAYLIST_EXPANSION_WORKERS, thread_name_prefix="mediadrop-playlist"
+        )
+
+    def create(
+        self,
+        urls: list[str],
+        mode: str,
+        quality: str,
+        video_quality: str,
+        max_parallel: int,
+        client_id: str | None = None,
+    ) -> DownloadBatch:
+        self.prune_expired()
+        # Reading a playlist is a network round trip per page, so it runs in
+        # the background and the request returns right away. The caller has
+        # already reserved max_parallel slots with the admission controller.
+        has_playlist = any(is_youtube_url(url) and is_playlist_url(url) for url in urls)
+        batch = DownloadBatch(
+            id=str(uuid4()),
+            mode=normalize_mode(mode),
+            quality=normalize_quality(quality),
+            video_quality=normalize_video_quality(video_quality),
+            max_parallel=clamp_batch_concurrency(max_parallel),
+            client_id=client_id,
+            expanding=has_playlist,
+        )
+        with self._lock:
+            self._batches[batch.id] = batch
+
+        if has_playlist:
+            self._expander.submit(self._expand, batch, urls)
+        else:
+            self._populate(batch, urls[: self.max_items])
+        return batch
+
+    def get(self, batch_id: str) -> DownloadBatch | None:
+        with self._lock:
+            return self._batches.get(batch_id)
+
+    def active(self) -> list[DownloadBatch]:
+        with self._lock:
+            return [batch for batch in self._batches.values() if not batch.is_finished]
+
+    def prune_expired(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [batch.id for batch in self._batches.values() if batch.finished_at and batch.finished_at < cutoff]
+            for batch_id in expired:
+                del self._batches[batch_id]
+
+    def _expand(self, batch: DownloadBatch, urls: list[str]) -> None:
+        try:
+            expanded = expand_batch_urls(urls, self.max_items)
+        except Exception as exc:
+            expanded = []
+            batch.error = f"Não foi possível ler a playlist: {sanitize_error_message(str(exc))}"
+        else:
+            if not expanded:
+                batch.error = "Nenhum vídeo encontrado para baixar."
+        self._populate(batch, expanded)
+
+    def _populate(self, batch: DownloadBatch, urls: list[str]) -> None:
+        items = []
+        for url in urls:
+            if is_youtube_url(url):
+                items.append(BatchItem(url=url))
+            else:
+                items.append(BatchItem(url=url, error="URL do YouTube inválida."))
+
+        with self._lock:
+            batch.items = items
+            batch.pending = deque(item for item in items if item.error is None)
+            batch.expanding = False
+        self._fill(batch)
+
+    def _fill(self, batch: DownloadBatch) -> None:
+        with self._lock:
+            # Cache hits finish inside submit() and call back into _fill;
+            # the outer loop already picks up the freed slot.
+            if batch.id in self._filling:
+                return
+            self._filling.add(batch.id)
+            try:
+                while batch.pending:
+                    running = sum(1 for item in batch.items if item.job is not None and not item.job.is_finished)
+                    if running >= batch.max_parallel:
+                        break
+                    item = batch.pending.popleft()
+                    item.job = self.jobs.submit(
+                        item.url,
+                        batch.mode,
+                        batch.quality,
+                        batch.video_quality,
+                        on_finished=lambda job, batch=batch: self._fill(batch),
+                        client_id=batch.client_id,
+                    )
+                if batch.finished_at is None and batch.is_finished:
+                    batch.finished_at = time.time()
+            finally:
+                self._filling.discard(batch.id)
+
+
+batch_manager = DownloadBatchManager(job_manager, JOB_RETENTION_SECONDS, BATCH_MAX_ITEMS)
+admission = AdmissionController(job_manager, batch_manager, MAX_IN_FLIGHT_JOBS, MAX_JOBS_PER_CLIENT)
+
+
+def is_playlist_url(url: str) -> bool:
+    parsed = urlparse(url)
+    if parsed.path == "/playlist":
+        return True
+    return "list" in parse_qs(parsed.query) and extract_video_id(url) is None
+
+
+def expand_playlist(url: str, limit: int) -> list[str]:
+    import yt_dlp
+
     options = {
         "quiet": True,
         "no_warnings": True,
-        "skip_download": True,
-        "noplaylist": True,
+        "extract_flat": "in_playlist",
+        "playlistend": limit,
+        "http_headers": dict(YDL_HTTP_HEADERS),
     }
-
     with yt_dlp.YoutubeDL(options) as ydl:
         info = ydl.extract_info(url, download=False)
 
-    return {
-        "title": info.get("title") or "Sem título",
-        "channel": info.get("uploader") or "Canal desconhecido",
-        "duration": format_duration(info.get("duration")),
-        "thumbnail": info.get("thumbnail"),
+    urls = []
+    for entry in info.get("entries") or []:
+        video_id = (entry or {}).get("id")
+        if video_id and YOUTUBE_VIDEO_ID_RE.match(video_id):
+            urls.append(f"https://www.youtube.com/watch?v={video_id}")
+    return urls[:limit]
+
+
+def expand_batch_urls(raw_urls: list[str], limit: int) -> list[str]:
+    urls: list[str] = []
+    for raw_url in raw_urls:
+        if len(urls) >= limit:
+            break
+        if is_youtube_url(raw_url) and is_playlist_url(raw_url):
+            urls.extend(expand_playlist(raw_url, limit - len(urls)))
+        else:
+            urls.append(raw_url)
+    return urls[:limit]
+
+
+streaming_slots = threading.BoundedSemaphore(MAX_STREAMING_JOBS)
+
+
+def content_disposition(filename: str) -> str:
+    ascii_name = filename.encode("ascii", "ignore").decode("ascii").replace('"', "") or "download"
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def resolve_stream_source(url: str) -> dict:
+    import yt_dlp
+
+    extraction = get_cached_extraction(url)
+    last_error: Exception | None = None
+    for strategy in strategy_selector.ordered():
+        started_at = time.monotonic()
+        options = with_strategy(
+            {
+                "quiet": True,
+                "no_warnings": True,
+                "noplaylist": True,
+                "format": STREAM_AUDIO_FORMAT,
+                "http_headers": dict(YDL_HTTP_HEADERS),
+            },
+            strategy,
+        )
+        try:
+            with yt_dlp.YoutubeDL(options) as ydl:
+                if extraction is not None and extraction.strategy == strategy.name:
+                    info = copy.deepcopy(extraction.info)
+                else:
+                    info = ydl.extract_info(url, download=False, process=False)
+                source = ydl.process_ie_result(info, download=False)
+        except Exception as exc:
+            last_error = exc
+            if is_content_error(exc):
+                break
+            strategy_selector.record(strategy.name, False, time.monotonic() - started_at)
+            continue
+
+        strategy_selector.record(strategy.name, True, time.monotonic() - started_at)
+        if not source.get("url"):
+            raise RuntimeError("Nenhum formato de áudio compatível com streaming.")
+        return source
+
+    raise RuntimeError(sanitize_error_message(str(last_error))) from last_error
+
+
+def build_stream_command(ffmpeg_path: str, source: dict, quality: str) -> list[str]:
+    headers = "".join(f"{name}: {value}\r\n" for name, value in (source.get("http_headers") or {}).items())
+    command = [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin"]
+    if headers:
+        command += ["-headers", headers]
+    command += [
+        "-reconnect",
+        "1",
+        "-reconnect_streamed",
+        "1",
+        "-i",
+        source["url"],
+        "-vn",
+        "-codec:a",
+        "libmp3lame",
+        "-b:a",
+        f"{normalize_quality(quality)}k",
+        "-f",
+        "mp3",
+        "pipe:1",
+    ]
+    return command
+
+
+def iter_ffmpeg_output(command: list[str]):
+    # Owns the streaming slot taken by stream_mp3: it is released however
+    # the generator ends, including when FFmpeg cannot be started.
+    process = None
+    # FFmpeg fetches the source itself, so the governor meters the encoded
+    # output; pipe backpressure slows FFmpeg's reads to the same pace.
+    lease = bandwidth_governor.register("audio")
+    try:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0) if sys.platform == "win32" else 0,
+        )
+        while True:
+            chunk = process.stdout.read1(STREAM_CHUNK_BYTES)
+            if not chunk:
+                break
+            lease.consume(len(chunk))
+            yield chunk
+        if process.wait() != 0:
+            stderr = process.stderr.read().decode("utf-8", "replace")
+            raise RuntimeError(sanitize_error_message(stderr) or "FFmpeg encerrou com erro.")
+    finally:
+        if process is not None:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            process.stdout.close()
+            process.stderr.close()
+        lease.close()
+        streaming_slots.release()
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    if not header:
+        return None
+    match = BYTE_RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        # Multi-range and malformed headers fall back to the full body.
+        return None
+
+    first, last = match.groups()
+    if not first:
+        suffix_length = int(last)
+        if suffix_length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - suffix_length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def parse_etag_list(header: str) -> set[str]:
+    tags = set()
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag:
+            tags.add(tag)
+    return tags
+
+
+def artifact_etag(path: Path) -> str:
+    stat = path.stat()
+    fingerprint = f"{path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{stat.st_ino}"
+    return f'"{hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def iter_file_range(path: Path, start: int, end: int):
+    with path.open("rb") as handle:
+        handle.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = handle.read(min(ARTIFACT_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def metered(chunks, endpoint: str, send_labels: dict | None = None):
+    started_at = time.monotonic()
+    try:
+        for chunk in chunks:
+            SENT_BYTES.inc(len(chunk), endpoint=endpoint)
+            yield chunk
+    finally:
+        if send_labels is not None:
+            DOWNLOAD_PHASE_SECONDS.observe(time.monotonic() - started_at, phase="send", **send_labels)
+
+
+def artifact_response(
+    request: Request,
+    path: Path,
+    headers: dict | None = None,
+    send_labels: dict | None = None,
+) -> Response:
+    stat = path.stat()
+    size = stat.st_size
+    etag = artifact_etag(path)
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+    guessed_media_type, _ = mimetypes.guess_type(path.name)
+    base_headers = {
+        **(headers or {}),
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=0, must-revalidate",
     }
 
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in parse_etag_list(if_none_match)):
+        return Response(status_code=304, headers=base_headers)
+
+    base_headers["Content-Disposition"] = content_disposition(path.name)
+    media_type = guessed_media_type or "application/octet-stream"
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and if_range.strip() not in {etag, last_modified}:
+        range_header = None
+
+    try:
+        byte_range = parse_byte_range(range_header, size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**base_headers, "Content-Range": f"bytes */{size}"})
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        status_code = 206
+        start, end = byte_range
+        base_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    base_headers["Content-Length"] = str(end - start + 1 if size else 0)
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=base_headers, media_type=media_type)
+    return StreamingResponse(
+        metered(iter_file_range(path, start, end), "file", send_labels),
+        status_code=status_code,
+        headers=base_headers,
+        media_type=media_type,
+    )
+
+
+class ZipStreamBuffer(io.RawIOBase):
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def unique_archive_names(paths: list[Path]) -> list[tuple[str, Path]]:
+    used: set[str] = set()
+    entries = []
+    for path in paths:
+        name = path.name
+        counter = 2
+        while name.lower() in used:
+            name = f"{path.stem} ({counter}){path.suffix}"
+            counter += 1
+        used.add(name.lower())
+        entries.append((name, path))
+    return entries
+
+
+def iter_zip_stream(entries: list[tuple[str, Path]]):
+    # The buffer is not seekable, so zipfile writes data descriptors after
+    # each member and the archive never has to exist on disk. Members are
+    # stored as-is: MP3/MP4 are already compressed.
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for arcname, path in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_STORED
+            with path.open("rb") as source, archive.open(info, mode="w") as target:
+                while chunk := source.read(ARTIFACT_CHUNK_BYTES):
+                    target.write(chunk)
+                    yield buffer.drain()
+            yield buffer.drain()
+    yield buffer.drain()
+
 
 @app.get("/", response_class=HTMLResponse)
-def index(request: Request):
-    return templates.TemplateResponse(
+def index(request: Request, background_tasks: BackgroundTasks):
+    # Warm yt-dlp up while the user is still pasting a URL.
+    background_tasks.add_task(importlib.import_module, "yt_dlp")
+    return get_templates().TemplateResponse(
         "index.html",
         {
             "request": request,
@@ -218,7 +1804,23 @@ def index(request: Request):
 
 @app.get("/health")
 def health_check():
-    return JSONResponse({"status": "ok", "app": APP_DISPLAY_NAME, "version": APP_VERSION})
+    return JSONResponse(
+        {
+            "status": "ok",
+            "app": APP_DISPLAY_NAME,
+            "version": APP_VERSION,
+            "queue": admission.snapshot(),
+            "transcode": transcode_pool.snapshot(),
+            "bandwidth": bandwidth_governor.snapshot(),
+            "toolchain": toolchain_probe.get().to_dict(),
+            "strategies": strategy_selector.snapshot(),
+        }
+    )
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 
 @app.get("/api/preview")
@@ -236,7 +1838,7 @@ def preview(url: str = Query(...)):
 
 @app.post("/api/download")
 def download(
-    background_tasks: BackgroundTasks,
+    request: Request,
     url: str = Form(...),
     mode: str = Form("mp3"),
     quality: str = Form("192"),
@@ -246,19 +1848,201 @@ def download(
     if not trimmed or not is_youtube_url(trimmed):
         return JSONResponse({"error": "Informe uma URL válida do YouTube."}, status_code=400)
 
-    temp_dir = DOWNLOADS_DIR / str(uuid4())
+    # Cache hits never run yt-dlp or FFmpeg, so only a miss needs the toolchain.
+    safe_mode = normalize_mode(mode)
+    video_id = extract_video_id(trimmed)
+    cache_key = (
+        MediaCache.make_key(video_id, safe_mode, normalize_quality(quality), normalize_video_quality(video_quality))
+        if video_id
+        else None
+    )
+    if not (cache_key and media_cache.contains(cache_key)):
+        unsupported = unsupported_mode_response(safe_mode)
+        if unsupported is not None:
+            return unsupported
+
+    client_id = client_identity(request)
     try:
-        file_path = download_media(trimmed, mode, quality, video_quality, temp_dir)
-    except Exception as exc:
-        return JSONResponse(
-            {"error": f"Falha no download: {sanitize_error_message(str(exc))}"},
-            status_code=500,
+        with admission.admit(client_id):
+            job = job_manager.submit(trimmed, mode, quality, video_quality, client_id=client_id)
+    except AdmissionRejected as rejection:
+        return rejection_response(rejection)
+
+    return JSONResponse(
+        job.to_dict(),
+        status_code=202,
+        headers={"X-MediaDrop-Cache": job.cache_status.upper()},
+    )
+
+
+@app.post("/api/batch")
+def create_batch(
+    request: Request,
+    urls: str = Form(...),
+    mode: str = Form("mp3"),
+    quality: str = Form("192"),
+    video_quality: str = Form("720"),
+    concurrency: int = Form(BATCH_DEFAULT_CONCURRENCY),
+):
+    raw_urls = [value for value in re.split(r"[\s,]+", urls) if value]
+    if not raw_urls:
+        return JSONResponse({"error": "Informe ao menos uma URL do YouTube."}, status_code=400)
+
+    unsupported = unsupported_mode_response(normalize_mode(mode))
+    if unsupported is not None:
+        return unsupported
+
+    client_id = client_identity(request)
+    slots = clamp_batch_concurrency(concurrency)
+    try:
+        with admission.admit(client_id, slots):
+            batch = batch_manager.create(raw_urls, mode, quality, video_quality, concurrency, client_id=client_id)
+    except AdmissionRejected as rejection:
+        return rejection_response(rejection)
+    return JSONResponse(batch.to_dict(), status_code=202)
+
+
+@app.get("/api/batches/{batch_id}")
+def batch_status(batch_id: str):
+    batch = batch_manager.get(batch_id)
+    if batch is None:
+        return JSONResponse({"error": "Lote não encontrado ou expirado."}, status_code=404)
+    return JSONResponse(batch.to_dict())
+
+
+@app.get("/api/batches/{batch_id}/zip")
+def batch_zip(batch_id: str):
+    batch = batch_manager.get(batch_id)
+    if batch is None:
+        return JSONResponse({"error": "Lote não encontrado ou expirado."}, status_code=404)
+    if not batch.is_finished:
+        return JSONResponse({"error": "Lote ainda em andamento."}, status_code=409)
+
+    paths = [
+        item.job.file_path
+        for item in batch.items
+        if item.job is not None and item.job.status == JOB_DONE and item.job.file_path and item.job.file_path.exists()
+    ]
+    if not paths:
+        return JSONResponse({"error": "Nenhum arquivo concluído neste lote."}, status_code=404)
+
+    return StreamingResponse(
+        metered(iter_zip_stream(unique_archive_names(paths)), "zip"),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(f"mediadrop-{batch.id[:8]}.zip")},
+    )
+
+
+@app.get("/api/jobs/{job_id}")
+def job_status(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Download não encontrado ou expirado."}, status_code=404)
+    return JSONResponse(job.to_dict())
+
+
+async def stream_job_events(job: DownloadJob):
+    sent_version = -1
+    last_sent_at = time.monotonic()
+    while True:
+        if job.version != sent_version:
+            sent_version = job.version
+            last_sent_at = time.monotonic()
+            event = job.status if job.is_finished else "progress"
+            yield f"event: {event}\ndata: {json.dumps(job.to_dict())}\n\n"
+            if job.is_finished:
+                return
+        elif time.monotonic() - last_sent_at >= JOB_EVENTS_KEEPALIVE_SECONDS:
+            last_sent_at = time.monotonic()
+            yield ": keepalive\n\n"
+        await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+
+@app.get("/api/jobs/{job_id}/events")
+def job_events(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Download não encontrado ou expirado."}, status_code=404)
+    return StreamingResponse(
+        stream_job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.api_route("/api/jobs/{job_id}/file", methods=["GET", "HEAD"])
+def job_file(job_id: str, request: Request):
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Download não encontrado ou expirado."}, status_code=404)
+    if job.status == JOB_FAILED:
+        return JSONResponse({"error": job.error}, status_code=500)
+    if job.status != JOB_DONE or job.file_path is None:
+        return JSONResponse({"error": "Download ainda em andamento."}, status_code=409)
+    if not job.file_path.exists():
+        return JSONResponse({"error": "Arquivo expirado. Faça o download novamente."}, status_code=410)
+
+    return artifact_response(
+        request,
+        job.file_path,
+        {"X-MediaDrop-Cache": job.cache_status.upper()},
+        send_labels=job.metric_labels,
+    )
+
+
+@app.get("/api/stream/mp3")
+def stream_mp3(background_tasks: BackgroundTasks, url: str = Query(...), quality: str = Query("192")):
+    trimmed = url.strip()
+    if not trimmed or not is_youtube_url(trimmed):
+        return JSONResponse({"error": "Informe uma URL válida do YouTube."}, status_code=400)
+
+    safe_quality = normalize_quality(quality)
+    video_id = extract_video_id(trimmed)
+    cache_key = MediaCache.make_key(video_id, "mp3", safe_quality, "") if video_id else None
+    cached_path = media_cache.get(cache_key) if cache_key else None
+    if cached_path is not None:
+        background_tasks.add_task(media_cache.release, cache_key)
+        return FileResponse(
+            path=str(cached_path),
+            filename=cached_path.name,
+            media_type="audio/mpeg",
+            headers={"X-MediaDrop-Cache": CACHE_HIT.upper()},
+        )
+
+    unsupported = unsupported_mode_response("mp3")
+    if unsupported is not None:
+        return unsupported
+    ffmpeg_path = get_ffmpeg_path()
+
+    if not streaming_slots.acquire(blocking=False):
+        return rejection_response(
+            AdmissionRejected("Muitos streams em andamento. Tente novamente em instantes.", STREAM_RETRY_AFTER_SECONDS)
         )
 
-    background_tasks.add_task(shutil.rmtree, temp_dir, ignore_errors=True)
-    guessed_media_type, _ = mimetypes.guess_type(file_path.name)
-    return FileResponse(
-        path=str(file_path),
-        filename=file_path.name,
-        media_type=guessed_media_type or "application/octet-stream",
+    try:
+        source = resolve_stream_source(trimmed)
+    except Exception as exc:
+        streaming_slots.release()
+        return JSONResponse({"error": f"Falha no streaming: {sanitize_error_message(str(exc))}"}, status_code=500)
+
+    # Pull the first chunk here so encoder failures still become a proper
+    # error response instead of a truncated 200.
+    chunks = iter_ffmpeg_output(build_stream_command(ffmpeg_path, source, safe_quality))
+    try:
+        first_chunk = next(chunks)
+    except StopIteration:
+        return JSONResponse({"error": "Falha no streaming: FFmpeg não produziu áudio."}, status_code=502)
+    except Exception as exc:
+        return JSONResponse({"error": f"Falha no streaming: {sanitize_error_message(str(exc))}"}, status_code=502)
+
+    from yt_dlp.utils import sanitize_filename
+
+    filename = f"{sanitize_filename(source.get('title') or video_id or 'audio')}.mp3"
+    return StreamingResponse(
+        metered(itertools.chain([first_chunk], chunks), "stream", {"mode": "mp3", "quality": safe_quality}),
+        media_type="audio/mpeg",
+        headers={
+            "Content-Disposition": content_disposition(filename),
+            "X-MediaDrop-Cache": CACHE_BYPASS.upper(),
+        },
     )
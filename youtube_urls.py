@@ -0,0 +1,50 @@
+import re
+from urllib.parse import parse_qs, urlparse
+
+# URL rules shared by the web app and the CLI.
+YOUTUBE_HOSTS = {
+    "youtube.com",
+    "www.youtube.com",
+    "m.youtube.com",
+    "music.youtube.com",
+    "youtu.be",
+    "www.youtu.be",
+}
+
+YOUTUBE_SHORT_HOSTS = {"youtu.be", "www.youtu.be"}
+YOUTUBE_PATH_PREFIXES = ("shorts", "embed", "live", "v")
+YOUTUBE_VIDEO_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def is_youtube_url(url: str) -> bool:
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return False
+
+    if parsed.scheme not in {"http", "https"}:
+        return False
+
+    host = (parsed.netloc or "").lower()
+    return host in YOUTUBE_HOSTS
+
+
+def extract_video_id(url: str) -> str | None:
+    if not is_youtube_url(url):
+        return None
+
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    path_parts = [part for part in parsed.path.split("/") if part]
+
+    candidate = None
+    if host in YOUTUBE_SHORT_HOSTS:
+        candidate = path_parts[0] if path_parts else None
+    elif parsed.path == "/watch":
+        candidate = (parse_qs(parsed.query).get("v") or [None])[0]
+    elif len(path_parts) >= 2 and path_parts[0] in YOUTUBE_PATH_PREFIXES:
+        candidate = path_parts[1]
+
+    if candidate and YOUTUBE_VIDEO_ID_RE.match(candidate):
+        return candidate
+    return None